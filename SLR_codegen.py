@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import hashlib
+import importlib.util
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from SLR_parser import ParseContext, SLRParser, SLRParserEngine, TokenMapper, private_cache_dir, semantic_id
+
+CODEGEN_VERSION = 2  # 生成代码的格式版本，变化后旧的缓存文件自动失效
+DISPATCH_LEAF = 3  # 状态分派树叶子节点中顺序比较的状态数
+
+_module_cache = {}  # 缓存键 -> 已导入的生成模块
+_module_lock = threading.Lock()
+
+
+class CodeWriter:
+    """带缩进的源码拼接"""
+
+    def __init__(self):
+        self.lines = []
+        self.indent = 0
+
+    def line(self, text: str = ""):
+        self.lines.append("    " * self.indent + text if text else "")
+
+    def source(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def cache_key(parser: SLRParser) -> str:
+    """生成模块的缓存键：由代码格式版本、文法指纹和开始符号决定"""
+    text = f"{CODEGEN_VERSION}:{parser.grammar.fingerprint()}:{parser.start_symbol}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def generate_source(parser: SLRParser) -> str:
+    """为分析表生成直接编码的 Python 模块源码
+
+    每个状态是状态分派树中的一个代码块：移进直接压栈并跳到常量目标状态，
+    归约按产生式长度直接弹栈并调用语义动作，GOTO 目标为常量或按非终结符生成的常量字典。
+    """
+    if parser.lazy:
+        parser.materialize_all()
+    grammar = parser.grammar
+    productions = grammar.productions_list
+    state_count = len(parser.states)
+    action_table = parser.action_table
+    goto_table = parser.goto_table
+
+    # 非终结符 -> {状态: 目标}；目标唯一时直接内联常量
+    gotos = {}
+    for state_idx in range(state_count):
+        for symbol, target in goto_table[state_idx].items():
+            gotos.setdefault(symbol, {})[state_idx] = target
+    goto_names = {symbol: f"GOTO_{index}" for index, symbol in enumerate(sorted(gotos))}
+
+    out = CodeWriter()
+    out.line("# -*- coding: UTF-8 -*-")
+    out.line("# 由 SLR_codegen 根据 SLR 分析表生成，请勿手工修改")
+    out.line()
+    out.line(f"CACHE_KEY = {cache_key(parser)!r}")
+    out.line(f"STATE_COUNT = {state_count}")
+    out.line(f"PRODUCTIONS = {[(lhs, list(rhs)) for lhs, rhs in productions]!r}")
+    out.line()
+    out.line("# 状态 -> 可接受的终结符，用于语法错误信息")
+    out.line("EXPECTED = [")
+    for state_idx in range(state_count):
+        out.line(f"    {tuple(sorted(action_table[state_idx]))!r},")
+    out.line("]")
+    out.line()
+    for symbol in sorted(gotos):
+        targets = gotos[symbol]
+        if len(set(targets.values())) > 1:
+            out.line(f"{goto_names[symbol]} = {dict(sorted(targets.items()))!r}  # {symbol}")
+    out.line()
+    out.line()
+    out.line("def parse(tokens, context, semantic, syntax_error, token_map):")
+    out.indent += 1
+    out.line('"""分析token序列，semantic / syntax_error 为 SLRParserEngine 的语义动作和错误报告方法"""')
+    out.line("get = token_map.get")
+    out.line("symbols = [get(token[0], token[1]) for token in tokens]")
+    out.line("symbols.append(None)")
+    out.line("states = [0]")
+    out.line("values = []")
+    out.line("positions = []")
+    out.line("error_count = len(context.errors)")
+    out.line("i = 0")
+    out.line("sym = symbols[0]")
+    out.line("state = 0")
+    out.line("while True:")
+    out.indent += 1
+
+    def emit_reduce(prod_idx: int):
+        lhs, rhs = productions[prod_idx]
+        sem = semantic_id(lhs, rhs)
+        out.line(f"# {lhs} -> {' '.join(rhs)}")
+        if rhs == ['ε']:
+            out.line(f"values.append(semantic(context, {sem}, {lhs!r}, [], [], values, positions, tokens))")
+            out.line("positions.append(i)")
+        else:
+            count = len(rhs)
+            out.line(f"popped_values = values[-{count}:]")
+            out.line(f"popped_positions = positions[-{count}:]")
+            out.line(f"del states[-{count}:]")
+            out.line(f"del values[-{count}:]")
+            out.line(f"del positions[-{count}:]")
+            out.line(f"values.append(semantic(context, {sem}, {lhs!r}, popped_values, popped_positions, "
+                     f"values, positions, tokens))")
+            out.line("positions.append(popped_positions[0])")
+        targets = set(gotos.get(lhs, {}).values())
+        if len(targets) == 1:
+            out.line(f"state = {targets.pop()}")
+        else:
+            out.line(f"state = {goto_names[lhs]}[states[-1]]")
+        out.line("states.append(state)")
+        out.line("continue")
+
+    def emit_state(state_idx: int):
+        # 按动作分组：先移进，再按产生式编号归约，最后接受
+        groups = {}
+        for symbol, action in action_table[state_idx].items():
+            groups.setdefault(action, []).append(symbol)
+
+        def order(action):
+            if action.startswith("s"):
+                return 0, int(action[1:])
+            if action.startswith("r"):
+                return 1, int(action[1:])
+            return 2, 0
+
+        for action in sorted(groups, key=order):
+            symbols = sorted(groups[action])
+            if len(symbols) == 1:
+                out.line(f"if sym == {symbols[0]!r}:")
+            else:
+                out.line(f"if sym in {{{', '.join(repr(symbol) for symbol in symbols)}}}:")
+            out.indent += 1
+            if action.startswith("s"):
+                target = int(action[1:])
+                out.line(f"states.append({target})")
+                out.line("values.append(tokens[i][1])")
+                out.line("positions.append(i)")
+                out.line("i += 1")
+                out.line("sym = symbols[i]")
+                out.line(f"state = {target}")
+                out.line("continue")
+            elif action.startswith("r"):
+                emit_reduce(int(action[1:]))
+            else:
+                out.line("context.accepted = True")
+                out.line("return len(context.errors) == error_count")
+            out.indent -= 1
+        out.line(f"return syntax_error(context, tokens, i, EXPECTED[{state_idx}])")
+
+    def emit_dispatch(low: int, high: int):
+        """按状态编号二分生成分派树"""
+        if high - low <= DISPATCH_LEAF:
+            for state_idx in range(low, high):
+                keyword = "if" if state_idx == low else "elif"
+                out.line(f"{keyword} state == {state_idx}:")
+                out.indent += 1
+                emit_state(state_idx)
+                out.indent -= 1
+            return
+        middle = (low + high) // 2
+        out.line(f"if state < {middle}:")
+        out.indent += 1
+        emit_dispatch(low, middle)
+        out.indent -= 1
+        out.line("else:")
+        out.indent += 1
+        emit_dispatch(middle, high)
+        out.indent -= 1
+
+    emit_dispatch(0, state_count)
+    out.line("return False")
+    return out.source()
+
+
+def load_module(parser: SLRParser, cache_dir: Optional[str] = None):
+    """返回分析表对应的生成模块
+
+    模块按缓存键写入 cache_dir（原子替换，可被同一用户的多个进程共享），同一进程内只导入一次。
+    缓存目录默认为 `~/.cache/slr/codegen`，必须只有当前用户可写（见 private_cache_dir），
+    否则他人放入的同名文件会被导入执行。
+    """
+    key = cache_key(parser)
+    module = _module_cache.get(key)
+    if module is not None:
+        return module
+
+    with _module_lock:
+        module = _module_cache.get(key)
+        if module is not None:
+            return module
+
+        cache_dir = private_cache_dir("codegen", cache_dir)
+        name = f"slr_direct_{key}"
+        path = os.path.join(cache_dir, f"{name}.py")
+        if not os.path.exists(path):
+            source = generate_source(parser)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(source)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _module_cache[key] = module
+        return module
+
+
+class DirectCodedEngine(SLRParserEngine):
+    """使用直接编码分析器的分析引擎
+
+    与 SLRParserEngine 共用语义动作和错误信息，结果完全相同；
+    开启 debug、build_tree 或从中间状态开始分析时退回表驱动的主循环。
+    文法修改后需调用 refresh 重新生成。
+    """
+
+    def __init__(self, parser: Optional[SLRParser] = None, cache_dir: Optional[str] = None):
+        super().__init__(parser)
+        self.cache_dir = cache_dir
+        self.module = load_module(self.parser, cache_dir)
+
+    def refresh(self):
+        """按当前文法重新加载生成模块"""
+        self.semantic_ids = [semantic_id(lhs, rhs) for lhs, rhs in self.grammar.productions_list]
+        self.module = load_module(self.parser, self.cache_dir)
+
+    def parse_with_context(self, tokens: List[Tuple[str, str, int]], context: ParseContext,
+                           start_states: Optional[List[int]] = None, start_symbols: Optional[List[str]] = None,
+                           stop_states: Optional[List[int]] = None) -> bool:
+        if context.debug or context.build_tree or start_states or stop_states is not None:
+            return super().parse_with_context(tokens, context, start_states, start_symbols, stop_states)
+        return self.module.parse(tokens, context, self.reduce_semantics, self.syntax_error, TokenMapper.TOKEN_MAP)
+
+
+def benchmark(tokens: List[Tuple], engines: Dict[str, SLRParserEngine], repeat: int = 20) -> Dict[str, float]:
+    """对同一token序列比较各引擎的平均分析时间（秒）"""
+    results = {}
+    for name, engine in engines.items():
+        engine.run(tokens, engine.new_context(debug=False))  # 预热
+        start = time.perf_counter()
+        for _ in range(repeat):
+            engine.run(tokens, engine.new_context(debug=False))
+        results[name] = (time.perf_counter() - start) / repeat
+    return results
+
+
+def main(argv: List[str]) -> int:
+    """命令行入口：比较表驱动引擎与直接编码引擎的分析速度"""
+    from lexer import default_lexer
+
+    path = argv[0] if argv else "13.src"
+    repeat = int(argv[1]) if len(argv) > 1 else 200
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    tokens, errors = default_lexer().tokenize(text, path)
+    if errors:
+        for error in errors:
+            print(error)
+        return 1
+
+    table_engine = SLRParserEngine()
+    direct_engine = DirectCodedEngine(table_engine.parser)
+    table_ok = table_engine.run(tokens, table_engine.new_context(debug=False))
+    direct_ok = direct_engine.run(tokens, direct_engine.new_context(debug=False))
+    if table_ok.intermediate_code != direct_ok.intermediate_code or table_ok.errors != direct_ok.errors:
+        print("两个引擎的分析结果不一致！")
+        return 1
+
+    timings = benchmark(tokens, {"表驱动": table_engine, "直接编码": direct_engine}, repeat)
+    print(f"token 数：{len(tokens)}，分析{'成功' if table_ok.success else '失败'}")
+    for name, elapsed in timings.items():
+        print(f"  {name:6} {elapsed * 1000:8.3f} ms")
+    print(f"  加速比  {timings['表驱动'] / timings['直接编码']:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,114 +1,235 @@
 # !/usr/bin/env python
 # -*- coding: UTF-8 -*-
 
+import asyncio
+import hashlib
+import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple, Dict, Any, Optional
 from collections import defaultdict, deque
 import uuid
 
+from symbol_table import SymbolOperand, SymbolTable
+
 
 class TokenMapper:
     """处理词法token到语法符号的映射"""
     
+    TOKEN_MAP = {
+        "ID": "d",  # 标识符
+        "NUMBER": "i",  # 数值
+        "LPA": "(",  # 左括号
+        "RPA": ")",  # 右括号
+        "LBR": "[",  # 左中括号
+        "RBR": "]",  # 右中括号
+        "LCU": "{",  # 左大括号
+        "RCU": "}",  # 右大括号
+        "SCO": ";",  # 分号
+        "ASG": "=",  # 赋值
+        "ADD": "+",  # 加号
+        "MUL": "*",  # 乘号
+        "COM": ",",  # 逗号
+        "AND": "∧",  # 逻辑与
+        "OR": "∨",  # 逻辑或
+        "REL": "r",  # 关系运算符
+        "QST": "?",  # 三元运算符问号
+        "COL": ":"  # 三元运算符冒号
+    }
+    
     @staticmethod
     def map_token_to_symbol(token_type: str, token_val: str) -> str:
-        """将词法token映射为语法分析用的终结符"""
-        token_map = {
-            "ID": "d",  # 标识符
-            "NUMBER": "i",  # 数值
-            "LPA": "(",  # 左括号
-            "RPA": ")",  # 右括号
-            "LBR": "[",  # 左中括号
-            "RBR": "]",  # 右中括号
-            "LCU": "{",  # 左大括号
-            "RCU": "}",  # 右大括号
-            "SCO": ";",  # 分号
-            "ASG": "=",  # 赋值
-            "ADD": "+",  # 加号
-            "MUL": "*",  # 乘号
-            "COM": ",",  # 逗号
-            "AND": "∧",  # 逻辑与
-            "OR": "∨",  # 逻辑或
-            "REL": "r",  # 关系运算符
-            "QST": "?",  # 三元运算符问号
-            "COL": ":"  # 三元运算符冒号
-        }
+        """将词法token映射为语法分析用的终结符（关键字等直接使用值）"""
+        return TokenMapper.TOKEN_MAP.get(token_type, token_val)
+
+
+def split_token_lines(token_lines: List[str], source_name: str = "output.txt") -> Tuple[List[Tuple[str, str, int]], List[str]]:
+    """将 `(类型, 值)` 格式的token行拆分为 (类型, 值, 行号) 列表，返回 (tokens, 错误信息)"""
+    tokens = []
+    errors = []
+    for line_num, line in enumerate(token_lines, 1):
+        line = line.strip()
+        if not line:
+            continue
         
-        if token_type in token_map:
-            return token_map[token_type]
-        elif token_type == "KEY":
-            return token_val  # 关键字直接使用值
-        else:
-            return token_val
+        if line.startswith('(') and line.endswith(')'):
+            content = line[1:-1]
+            comma_pos = content.find(', ')
+            if comma_pos != -1:
+                token_type = content[:comma_pos].strip()
+                token_val = content[comma_pos + 2:].strip()
+                tokens.append((token_type, token_val, line_num))
+                continue
+        
+        errors.append(f"{source_name}:{line_num}: 错误：无效的token格式：{line}")
+    
+    if not tokens or tokens[-1][0] != "$":
+        tokens.append(("$", "$", len(token_lines) + 1))
+    return tokens, errors
+
+
+def format_location(source_name: str, token: Tuple) -> str:
+    """格式化错误位置：`文件:行`，token 带列号时为 `文件:行:列`"""
+    if len(token) > 3:
+        return f"{source_name}:{token[2]}:{token[3]}"
+    return f"{source_name}:{token[2]}"
+
+
+def private_cache_dir(name: str, directory: Optional[str] = None) -> str:
+    """返回当前用户私有的缓存目录，不存在时以 0700 权限创建
+
+    未指定 directory 时使用 `$XDG_CACHE_HOME/slr/name`（默认 `~/.cache/slr/name`）。
+    缓存中的文件会被导入或反序列化，因此目录必须属于当前用户且组和其他用户不可写，否则抛出 PermissionError。
+    """
+    if directory is None:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        directory = os.path.join(base, "slr", name)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if hasattr(os, "getuid"):
+        info = os.stat(directory)
+        if info.st_uid != os.getuid() or info.st_mode & 0o022:
+            raise PermissionError(f"缓存目录不属于当前用户或可被他人写入：{directory}")
+    return directory
+
+
+DEFAULT_GRAMMAR_RULES = [
+    ("P'", ["P"]),  # 0: 扩展开始产生式
+    ("P", ["C", "Q"]),  # 1
+    ("C", ["ε"]),  # 2
+    ("C", ["C", "D", ";"]),  # 3
+    ("D", ["T", "d"]),  # 4
+    ("D", ["T", "d", "[", "i", "]"]),  # 5
+    ("D", ["T", "d", "(", "N", ")", "{", "C", "Q", "}"]),  # 6
+    ("T", ["int"]),  # 7
+    ("T", ["void"]),  # 8
+    ("N", ["ε"]),  # 9
+    ("N", ["N", "A", ";"]),  # 10
+    ("A", ["T", "d"]),  # 11
+    ("A", ["d", "[", "]"]),  # 12
+    ("A", ["T", "d", "(", ")"]),  # 13
+    ("Q", ["S"]),  # 14
+    ("Q", ["Q", ";", "S"]),  # 15
+    ("S", ["d", "=", "E"]),  # 16
+    ("S", ["if", "(", "B", ")", "S"]),  # 17
+    ("S", ["if", "(", "B", ")", "S", "else", "S"]),  # 18
+    ("S", ["while", "(", "B", ")", "S"]),  # 19
+    ("S", ["return", "E"]),  # 20
+    ("S", ["{", "Q", "}"]),  # 21
+    ("S", ["d", "(", "M", ")"]),  # 22
+    ("B", ["B", "∧", "B"]),  # 23
+    ("B", ["B", "∨", "B"]),  # 24
+    ("B", ["E", "r", "E"]),  # 25
+    ("B", ["E"]),  # 26
+    ("E", ["d", "=", "E"]),  # 27
+    ("E", ["i"]),  # 28
+    ("E", ["d"]),  # 29
+    ("E", ["d", "(", "M", ")"]),  # 30
+    ("E", ["E", "+", "E"]),  # 31
+    ("E", ["E", "*", "E"]),  # 32
+    ("E", ["(", "E", ")"]),  # 33
+    ("E", ["E", "?", "E", ":", "E"]),  # 34
+    ("M", ["ε"]),  # 35
+    ("M", ["M", "R", ","]),  # 36
+    ("R", ["E"]),  # 37
+    ("R", ["d", "[", "]"]),  # 38
+    ("R", ["d", "(", ")"]),  # 39
+]
+
+
+# 内置文法的FOLLOW集补充项（对内置文法的计算结果没有影响）
+DEFAULT_FOLLOW_EXTRA = {
+    'Q': {'}'},
+    'S': {'}', ';', 'else'},
+    'E': {'?', ':', ')', ';', '}', ',', 'r', '+', '*', '∧', '∨'},
+}
+
+
+# 内置文法的运算符优先级：终结符 -> (优先级, 结合性)，数字越大优先级越高
+DEFAULT_PRECEDENCE = {
+    '=': (1, 'right'),
+    '?': (2, 'right'),
+    ':': (2, 'right'),
+    '∨': (3, 'left'),
+    '∧': (4, 'left'),
+    '+': (5, 'left'),
+    '*': (6, 'left'),
+}
 
 
 class Grammar:
     """处理文法解析和FIRST/FOLLOW集计算"""
     
-    def __init__(self):
+    def __init__(self, grammar_rules: Optional[List[Tuple[str, List[str]]]] = None):
         self.productions = defaultdict(list)  # 产生式字典
         self.productions_list = []  # 产生式列表
+        self.terminals = set()  # 终结符集合（含 '$'）
+        self.follow_extra = {}  # FOLLOW集补充项
+        self.precedence = {}  # 运算符优先级，用于解决移进/归约冲突
         self.first = {}  # FIRST集
         self.follow = {}  # FOLLOW集
-        self.initialize_grammar()
-    
-    def initialize_grammar(self):
-        grammar_rules = [
-            ("P'", ["P"]),  # 0: 扩展开始产生式
-            ("P", ["C", "Q"]),  # 1
-            ("C", ["ε"]),  # 2
-            ("C", ["C", "D", ";"]),  # 3
-            ("D", ["T", "d"]),  # 4
-            ("D", ["T", "d", "[", "i", "]"]),  # 5
-            ("D", ["T", "d", "(", "N", ")", "{", "C", "Q", "}"]),  # 6
-            ("T", ["int"]),  # 7
-            ("T", ["void"]),  # 8
-            ("N", ["ε"]),  # 9
-            ("N", ["N", "A", ";"]),  # 10
-            ("A", ["T", "d"]),  # 11
-            ("A", ["d", "[", "]"]),  # 12
-            ("A", ["T", "d", "(", ")"]),  # 13
-            ("Q", ["S"]),  # 14
-            ("Q", ["Q", ";", "S"]),  # 15
-            ("S", ["d", "=", "E"]),  # 16
-            ("S", ["if", "(", "B", ")", "S"]),  # 17
-            ("S", ["if", "(", "B", ")", "S", "else", "S"]),  # 18
-            ("S", ["while", "(", "B", ")", "S"]),  # 19
-            ("S", ["return", "E"]),  # 20
-            ("S", ["{", "Q", "}"]),  # 21
-            ("S", ["d", "(", "M", ")"]),  # 22
-            ("B", ["B", "∧", "B"]),  # 23
-            ("B", ["B", "∨", "B"]),  # 24
-            ("B", ["E", "r", "E"]),  # 25
-            ("B", ["E"]),  # 26
-            ("E", ["d", "=", "E"]),  # 27
-            ("E", ["i"]),  # 28
-            ("E", ["d"]),  # 29
-            ("E", ["d", "(", "M", ")"]),  # 30
-            ("E", ["E", "+", "E"]),  # 31
-            ("E", ["E", "*", "E"]),  # 32
-            ("E", ["(", "E", ")"]),  # 33
-            ("E", ["E", "?", "E", ":", "E"]),  # 34
-            ("M", ["ε"]),  # 35
-            ("M", ["M", "R", ","]),  # 36
-            ("R", ["E"]),  # 37
-            ("R", ["d", "[", "]"]),  # 38
-            ("R", ["d", "(", ")"]),  # 39
-        ]
+        self.initialize_grammar(grammar_rules)
+    
+    def initialize_grammar(self, grammar_rules=None):
+        """加载产生式列表，未指定时使用内置文法（第0条须为扩展开始产生式）"""
+        if grammar_rules is None:
+            grammar_rules = DEFAULT_GRAMMAR_RULES
+            self.follow_extra = DEFAULT_FOLLOW_EXTRA
+            self.precedence = DEFAULT_PRECEDENCE
         
         for lhs, rhs in grammar_rules:
+            rhs = list(rhs)
             self.productions[lhs].append(rhs)
             self.productions_list.append((lhs, rhs))
+        
+        self.update_terminals()
+    
+    def update_terminals(self):
+        """按当前产生式重新确定终结符集合"""
+        self.terminals = {sym for _, rhs in self.productions_list for sym in rhs
+                          if sym not in self.productions and sym != 'ε'}
+        self.terminals.add('$')
+    
+    def add_production(self, lhs: str, rhs: List[str]):
+        """追加一条产生式"""
+        rhs = list(rhs)
+        if rhs in self.productions.get(lhs, []):
+            raise ValueError(f"产生式已存在：{lhs} -> {' '.join(rhs)}")
+        self.productions[lhs].append(rhs)
+        self.productions_list.append((lhs, rhs))
+        self.update_terminals()
+    
+    def remove_production(self, lhs: str, rhs: List[str]):
+        """删除一条产生式（扩展开始产生式除外），其后产生式的编号前移"""
+        rhs = list(rhs)
+        if (lhs, rhs) == self.productions_list[0]:
+            raise ValueError("不能删除扩展开始产生式")
+        if rhs not in self.productions.get(lhs, []):
+            raise ValueError(f"产生式不存在：{lhs} -> {' '.join(rhs)}")
+        self.productions[lhs].remove(rhs)
+        if not self.productions[lhs]:
+            del self.productions[lhs]
+        self.productions_list.remove((lhs, rhs))
+        self.update_terminals()
+    
+    def fingerprint(self) -> str:
+        """文法指纹：由产生式、FOLLOW补充项和运算符优先级决定"""
+        content = repr((self.productions_list, sorted((k, sorted(v)) for k, v in self.follow_extra.items()),
+                        sorted(self.precedence.items())))
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+    
+    def rule_precedence(self, rhs: List[str]) -> Optional[Tuple[int, str]]:
+        """产生式的优先级：与 yacc 相同，取右部最后一个终结符的优先级"""
+        for symbol in reversed(rhs):
+            if symbol in self.terminals:
+                return self.precedence.get(symbol)
+        return None
     
     def compute_first(self):
         """计算FIRST集"""
         self.first = defaultdict(set)
         
-        terminals = {'int', 'void', 'if', 'else', 'while', 'return',
-                     '(', ')', '[', ']', '{', '}', ';', '=', '+', '*',
-                     '∧', '∨', 'r', ',', 'd', 'i', '$', 'ε', '?', ':'}
-        
-        for t in terminals:
+        for t in self.terminals | {'ε'}:
             self.first[t].add(t)
         
         changed = True
@@ -169,9 +290,10 @@ class Grammar:
                             if len(self.follow[symbol]) > old_size:
                                 changed = True
         
-        self.follow['Q'].add('}')
-        self.follow['S'].update({'}', ';', 'else'})
-        self.follow['E'].update({'?', ':', ')', ';', '}', ',', 'r', '+', '*', '∧', '∨'})
+        # 不含 follow_extra 的FOLLOW集，供增量更新时求不动点使用
+        self.follow_base = defaultdict(set, {symbol: set(follow) for symbol, follow in self.follow.items()})
+        for symbol, extra in self.follow_extra.items():
+            self.follow[symbol].update(extra)
 
 
 class Item:
@@ -181,12 +303,17 @@ class Item:
         self.lhs = lhs
         self.rhs = rhs[:]
         self.dot = dot
+        # 项不可变；项集运算反复比较、哈希项并查询下一个符号，构造时一并算好
+        self.key = (lhs, tuple(rhs), dot)
+        self.hash = hash(self.key)
+        self.complete = dot >= len(rhs) or rhs == ['ε']
+        self.next = None if self.complete else rhs[dot]
     
     def __eq__(self, other):
-        return (self.lhs, tuple(self.rhs), self.dot) == (other.lhs, tuple(other.rhs), other.dot)
+        return self.key == other.key
     
     def __hash__(self):
-        return hash((self.lhs, tuple(self.rhs), self.dot))
+        return self.hash
     
     def __repr__(self):
         rhs_with_dot = self.rhs[:]
@@ -194,219 +321,725 @@ class Item:
         return f"{self.lhs} -> {' '.join(rhs_with_dot)}"
     
     def is_complete(self):
-        return self.dot >= len(self.rhs) or (len(self.rhs) == 1 and self.rhs[0] == 'ε')
+        return self.complete
     
     def next_symbol(self):
-        if self.is_complete() or self.rhs == ['ε']:
-            return None
-        return self.rhs[self.dot]
+        return self.next
+
+
+class LazyTable(dict):
+    """惰性分析表：首次访问某状态的行时才构建该状态"""
+    
+    def __init__(self, parser):
+        super().__init__()
+        self.parser = parser
+    
+    def __missing__(self, state_idx):
+        self.parser.materialize(state_idx)
+        return dict.__getitem__(self, state_idx)
 
 
 class SLRParser:
-    """SLR(1)解析器"""
+    """SLR(1)解析器
+
+    lazy 为 True 时只构建开始状态，其余状态及其 ACTION/GOTO 行在分析过程中首次到达时才计算。
+    两种模式的分析结果相同，仅状态编号顺序可能不同。
+    """
     
-    def __init__(self, grammar, start_symbol):
+    def __init__(self, grammar, start_symbol, lazy=False, report_conflicts=True):
         self.grammar = grammar
         self.start_symbol = start_symbol
+        self.lazy = lazy
         self.states = []
+        self.state_index = {}  # 项集 -> 状态编号
         self.transitions = {}
-        self.action_table = {}
-        self.goto_table = {}
+        self.prod_index = {}  # (左部, 右部) -> 产生式编号
+        self.action_table = LazyTable(self) if lazy else {}
+        self.goto_table = LazyTable(self) if lazy else {}
+        self.closure_cache = {}  # 核心项集 -> 闭包，文法修改后只丢弃受影响的条目
+        self.prediction_cache = {}  # 非终结符 -> 其在闭包中引入的项，文法修改后全部丢弃
+        self.goto_cache = {}  # (项集, 符号) -> GOTO 结果
+        self.stale_closures = set()  # invalidate_nonterminal 丢弃、尚未重新展开的闭包
+        self.conflicts = []  # (状态, 符号, 保留的动作, 舍弃的动作)
+        self.report_conflicts = report_conflicts  # 构建完整张表时是否打印冲突（冲突总是记录在 conflicts 中）
+        self.conflicts_reported = False  # 惰性模式下是否已打印过冲突
+        self.lock = threading.Lock()
         self.build_parser()
     
+    def predictions(self, symbol) -> frozenset:
+        """非终结符 symbol 在闭包中引入的全部项：沿产生式的第一个符号可达的非终结符的所有产生式，圆点在最左端"""
+        cached = self.prediction_cache.get(symbol)
+        if cached is not None:
+            return cached
+        
+        productions = self.grammar.productions
+        items = set()
+        seen = {symbol}
+        stack = [symbol]
+        while stack:
+            lhs = stack.pop()
+            for rhs in productions[lhs]:
+                item = Item(lhs, rhs, 0)
+                items.add(item)
+                if item.next in productions and item.next not in seen:
+                    seen.add(item.next)
+                    stack.append(item.next)
+        
+        result = frozenset(items)
+        self.prediction_cache[symbol] = result
+        return result
+    
     def closure(self, items):
-        """计算项集的闭包"""
-        closure_set = set(items)
-        changed = True
+        """计算项集的闭包：核心项加上各项下一个非终结符引入的项"""
+        kernel = frozenset(items)
+        cached = self.closure_cache.get(kernel)
+        if cached is not None:
+            return cached
         
-        while changed:
-            changed = False
-            new_items = set()
-            
-            for item in closure_set:
-                next_sym = item.next_symbol()
-                if next_sym and next_sym in self.grammar.productions:
-                    for prod in self.grammar.productions[next_sym]:
-                        new_item = Item(next_sym, prod, 0)
-                        if new_item not in closure_set:
-                            new_items.add(new_item)
-            
-            if new_items:
-                closure_set.update(new_items)
-                changed = True
+        productions = self.grammar.productions
+        closure_set = set(kernel)
+        for next_sym in {item.next_symbol() for item in kernel}:
+            if next_sym in productions:
+                closure_set |= self.predictions(next_sym)
         
-        return frozenset(closure_set)
+        result = frozenset(closure_set)
+        self.closure_cache[kernel] = result
+        return result
+    
+    def successors(self, items) -> Dict[str, set]:
+        """一次遍历项集，按下一个符号分组得到各 GOTO 的核心项"""
+        moved = defaultdict(set)
+        for item in items:
+            next_sym = item.next_symbol()
+            if next_sym is not None:
+                moved[next_sym].add(Item(item.lhs, item.rhs, item.dot + 1))
+        return moved
     
     def goto(self, items, symbol):
-        """计算GOTO(I, X)"""
-        moved_items = set()
+        """计算GOTO(I, X)；未命中缓存时一次算出项集对所有符号的 GOTO"""
+        cached = self.goto_cache.get((items, symbol))
+        if cached is not None:
+            return cached
         
-        for item in items:
-            if item.next_symbol() == symbol:
-                new_item = Item(item.lhs, item.rhs, item.dot + 1)
-                moved_items.add(new_item)
+        for next_sym, moved_items in self.successors(items).items():
+            self.goto_cache[(items, next_sym)] = self.closure(moved_items)
+        return self.goto_cache.get((items, symbol), frozenset())
+    
+    def add_state(self, state) -> int:
+        """登记项集，返回其状态编号"""
+        state_idx = self.state_index.get(state)
+        if state_idx is None:
+            state_idx = len(self.states)
+            self.states.append(state)
+            self.state_index[state] = state_idx
+        return state_idx
+    
+    def expand_state(self, state_idx) -> List[int]:
+        """计算状态的全部后继，返回新发现的状态编号"""
+        state = self.states[state_idx]
+        new_states = []
+        symbols = sorted({item.next_symbol() for item in state} - {None})
         
-        if moved_items:
-            return self.closure(moved_items)
-        else:
-            return frozenset()
+        for symbol in symbols:
+            next_state = self.goto(state, symbol)
+            count = len(self.states)
+            next_idx = self.add_state(next_state)
+            if next_idx == count:
+                new_states.append(next_idx)
+            self.transitions[(state_idx, symbol)] = next_idx
+        
+        return new_states
     
     def build_states(self):
         """构建LR(0)项集的规范集"""
         start_item = Item(self.start_symbol, self.grammar.productions[self.start_symbol][0], 0)
-        start_state = self.closure([start_item])
+        self.add_state(self.closure([start_item]))
         
-        self.states = [start_state]
+        queue = deque([0])
+        while queue:
+            queue.extend(self.expand_state(queue.popleft()))
+    
+    def build_row(self, state_idx):
+        """构建一个状态的ACTION行和GOTO行
+
+        先填移进，再按产生式编号填归约。与 yacc 相同：产生式和向前看符号都有优先级时，
+        优先级高者胜出，优先级相同时左结合取归约、右结合取移进，这类冲突视为已解决；
+        其余移进/归约冲突取移进，归约/归约冲突取编号小的产生式。
+        """
+        terminals = self.grammar.terminals
+        precedence = self.grammar.precedence
+        state = self.states[state_idx]
+        actions = {}
+        gotos = {}
         
-        all_symbols = set()
-        for prods in self.grammar.productions.values():
-            for prod in prods:
-                for sym in prod:
-                    if sym != 'ε':
-                        all_symbols.add(sym)
+        for symbol in sorted({item.next_symbol() for item in state} - {None}):
+            next_state = self.transitions[(state_idx, symbol)]
+            if symbol in terminals:
+                actions[symbol] = f"s{next_state}"
+            else:
+                gotos[symbol] = next_state
         
-        queue = deque([0])
+        accept = False
+        reductions = []
+        for item in state:
+            if not item.is_complete():
+                continue
+            if (item.lhs == self.start_symbol and
+                    item.rhs == self.grammar.productions[self.start_symbol][0]):
+                accept = True
+                continue
+            prod_idx = self.prod_index.get((item.lhs, tuple(item.rhs)))
+            if prod_idx is None:
+                print(f"警告：找不到产生式 {(item.lhs, item.rhs)}")
+            else:
+                reductions.append((prod_idx, item.lhs))
         
-        while queue:
-            current_idx = queue.popleft()
-            current_state = self.states[current_idx]
-            
-            for symbol in all_symbols:
-                next_state = self.goto(current_state, symbol)
-                
-                if next_state:
-                    try:
-                        next_idx = self.states.index(next_state)
-                    except ValueError:
-                        next_idx = len(self.states)
-                        self.states.append(next_state)
-                        queue.append(next_idx)
-                    
-                    self.transitions[(current_idx, symbol)] = next_idx
+        for prod_idx, lhs in sorted(reductions):
+            rule = self.grammar.rule_precedence(self.grammar.productions_list[prod_idx][1])
+            for follow_sym in sorted(self.grammar.follow[lhs]):
+                current = actions.get(follow_sym)
+                if current is None:
+                    actions[follow_sym] = f"r{prod_idx}"
+                    continue
+                if current.startswith("s") and rule is not None and follow_sym in precedence:
+                    level, assoc = precedence[follow_sym]
+                    if rule[0] > level or (rule[0] == level and assoc == 'left'):
+                        actions[follow_sym] = f"r{prod_idx}"
+                    continue
+                self.conflicts.append((state_idx, follow_sym, current, f"r{prod_idx}"))
+        
+        if accept:
+            actions['$'] = 'acc'
+        
+        # 先写入完整的GOTO行，再写入ACTION行，保证并发读取时看到的行总是完整的
+        self.goto_table[state_idx] = gotos
+        self.action_table[state_idx] = actions
     
     def build_tables(self):
         """构建ACTION和GOTO表"""
-        terminals = {'int', 'void', 'if', 'else', 'while', 'return',
-                     '(', ')', '[', ']', '{', '}', ';', '=', '+', '*',
-                     '∧', '∨', 'r', ',', 'd', 'i', '$', '?', ':'}
-        nonterminals = set(self.grammar.productions.keys())
-        
-        for i in range(len(self.states)):
-            self.action_table[i] = {}
-            self.goto_table[i] = {}
-        
-        for state_idx, state in enumerate(self.states):
-            for item in state:
-                if not item.is_complete():
-                    next_sym = item.next_symbol()
-                    if next_sym and (state_idx, next_sym) in self.transitions:
-                        next_state = self.transitions[(state_idx, next_sym)]
-                        
-                        if next_sym in terminals:
-                            if next_sym in self.action_table[state_idx]:
-                                print(f"移进/归约冲突在状态{state_idx}, 符号'{next_sym}'")
-                            else:
-                                self.action_table[state_idx][next_sym] = f"s{next_state}"
-                        elif next_sym in nonterminals:
-                            self.goto_table[state_idx][next_sym] = next_state
-                else:
-                    if (item.lhs == self.start_symbol and
-                            item.rhs == self.grammar.productions[self.start_symbol][0]):
-                        self.action_table[state_idx]['$'] = 'acc'
-                    else:
-                        prod = (item.lhs, item.rhs)
-                        try:
-                            prod_idx = self.grammar.productions_list.index(prod)
-                            for follow_sym in self.grammar.follow[item.lhs]:
-                                if follow_sym in self.action_table[state_idx]:
-                                    print(f"归约/归约冲突在状态{state_idx}, 符号'{follow_sym}'")
-                                else:
-                                    self.action_table[state_idx][follow_sym] = f"r{prod_idx}"
-                        except ValueError:
-                            print(f"警告：找不到产生式 {prod}")
+        for state_idx in range(len(self.states)):
+            self.build_row(state_idx)
+        if self.report_conflicts:
+            self.print_conflicts()
+    
+    def print_conflicts(self):
+        """打印记录的全部冲突"""
+        for state_idx, symbol, kept, _ in self.conflicts:
+            if kept.startswith("s"):
+                print(f"移进/归约冲突在状态{state_idx}, 符号'{symbol}'")
+            else:
+                print(f"归约/归约冲突在状态{state_idx}, 符号'{symbol}'")
+    
+    def materialize(self, state_idx):
+        """惰性模式下计算一个状态的后继及其ACTION/GOTO行"""
+        with self.lock:
+            if state_idx in self.action_table:
+                return
+            if not 0 <= state_idx < len(self.states):
+                raise KeyError(state_idx)
+            self.expand_state(state_idx)
+            self.build_row(state_idx)
+    
+    def materialize_all(self):
+        """计算全部状态，惰性模式下得到与立即模式相同的完整分析表
+
+        惰性构建的行不打印冲突（分析过程中不应向标准输出写入），在第一次补全整张表时统一打印。
+        """
+        state_idx = 0
+        while state_idx < len(self.states):
+            self.action_table[state_idx]
+            state_idx += 1
+        if self.lazy and self.report_conflicts and not self.conflicts_reported:
+            self.conflicts_reported = True
+            self.print_conflicts()
     
     def build_parser(self):
         """构建解析器"""
         self.grammar.compute_first()
         self.grammar.compute_follow(self.start_symbol)
-        self.build_states()
-        self.build_tables()
+        self.rebuild()
+    
+    def rebuild(self):
+        """在FIRST/FOLLOW已是最新的前提下重建状态集和分析表，复用未失效的闭包和GOTO缓存"""
+        self.states = []
+        self.state_index = {}
+        self.transitions = {}
+        self.conflicts = []
+        self.conflicts_reported = False
+        self.stale_closures = set()
+        self.prod_index = {}
+        for prod_idx, (lhs, rhs) in enumerate(self.grammar.productions_list):
+            self.prod_index.setdefault((lhs, tuple(rhs)), prod_idx)
+        self.action_table = LazyTable(self) if self.lazy else {}
+        self.goto_table = LazyTable(self) if self.lazy else {}
+        if self.lazy:
+            start_item = Item(self.start_symbol, self.grammar.productions[self.start_symbol][0], 0)
+            self.add_state(self.closure([start_item]))
+        else:
+            self.build_states()
+            self.build_tables()
+    
+    def rebuild_rows(self, follow_changed, status_changed) -> int:
+        """文法修改后增量更新状态集和分析表，返回重建的行数
+
+        调用前须先对被修改的非终结符调用 invalidate_nonterminal。只有闭包被其丢弃的状态按原来的核心项集重新求闭包，
+        并只重新计算闭包中增减的项所涉及的转移；新出现的状态追加在末尾并完整展开，其余状态的项集、转移和编号保持不变。
+        不再可达的状态被删除，空出的编号由末尾的状态填补。
+        ACTION/GOTO 行只在状态被重新展开、完成项左部的FOLLOW集变化或完成项的右部含有身份变化的符号时重建，
+        其余行沿用原结果（必要时改写其中的状态编号和产生式编号）。
+        因此状态编号可能与完整构建不同，但状态集和各状态的动作相同。惰性模式下退化为完整重建。
+        """
+        if self.lazy:
+            self.rebuild()
+            self.materialize_all()
+            return len(self.states)
+        
+        stale = self.stale_closures
+        self.stale_closures = set()
+        old_prod_index = self.prod_index
+        self.prod_index = {}
+        for prod_idx, (lhs, rhs) in enumerate(self.grammar.productions_list):
+            self.prod_index.setdefault((lhs, tuple(rhs)), prod_idx)
+        prod_map = {old_idx: self.prod_index.get(key) for key, old_idx in old_prod_index.items()
+                    if self.prod_index.get(key) != old_idx}
+        
+        # 闭包失效的状态按原来的核心项集重新求闭包，编号不变；其行稍后重建
+        changed = {}  # 状态编号 -> 原闭包
+        for state_idx, state in enumerate(self.states):
+            if state in stale:
+                changed[state_idx] = state
+                del self.state_index[state]
+                self.action_table.pop(state_idx, None)
+                self.goto_table.pop(state_idx, None)
+        for state_idx, old_state in changed.items():
+            state = self.closure(self.kernel(old_state))
+            self.states[state_idx] = state
+            self.state_index[state] = state_idx
+        
+        # 闭包中增减的项所涉及的符号重新计算 GOTO，其余转移的目标核心项集不变
+        first_new = len(self.states)
+        detached = False  # 是否有转移被删除或改指其他状态，只有这时才可能出现不可达的状态
+        for state_idx, old_state in changed.items():
+            state = self.states[state_idx]
+            symbols = {item.next for item in state ^ old_state} - {None}
+            if not symbols:
+                continue
+            moved = self.successors(item for item in state if item.next in symbols)
+            for symbol in sorted(symbols):
+                old_target = self.transitions.pop((state_idx, symbol), None)
+                if symbol in moved:
+                    self.transitions[(state_idx, symbol)] = self.add_state(self.closure(moved[symbol]))
+                detached = detached or old_target not in (None, self.transitions.get((state_idx, symbol)))
+        state_idx = first_new
+        while state_idx < len(self.states):
+            self.expand_state(state_idx)
+            state_idx += 1
+        
+        moved = set(self.remove_unreachable().values()) if detached else set()
+        retarget = {source for (source, _), target in self.transitions.items() if target in moved}
+        
+        rebuild = set()
+        for state_idx, state in enumerate(self.states):
+            if state_idx not in self.action_table or any(
+                    item.complete and
+                    (item.lhs in follow_changed or status_changed and not status_changed.isdisjoint(item.rhs))
+                    for item in state):
+                rebuild.add(state_idx)
+        
+        reduce_map = {f"r{old_idx}": f"r{new_idx}" for old_idx, new_idx in prod_map.items()}
+        
+        def renumber(state_idx, symbol, action):
+            if state_idx in retarget and action.startswith("s"):
+                return f"s{self.transitions[(state_idx, symbol)]}"
+            return reduce_map.get(action, action)
+        
+        self.conflicts = [conflict for conflict in self.conflicts if conflict[0] not in rebuild]
+        if prod_map or retarget:
+            self.conflicts = [(state_idx, symbol, renumber(state_idx, symbol, kept), renumber(state_idx, symbol, dropped))
+                              for state_idx, symbol, kept, dropped in self.conflicts]
+            for state_idx in (range(len(self.states)) if prod_map else retarget):
+                if state_idx in rebuild:
+                    continue
+                if state_idx in retarget:
+                    self.goto_table[state_idx] = {symbol: self.transitions[(state_idx, symbol)]
+                                                  for symbol in self.goto_table[state_idx]}
+                self.action_table[state_idx] = {symbol: renumber(state_idx, symbol, action)
+                                                for symbol, action in self.action_table[state_idx].items()}
+        
+        for state_idx in sorted(rebuild):
+            self.build_row(state_idx)
+        self.conflicts.sort(key=lambda conflict: conflict[0])
+        return len(rebuild)
+    
+    def remove_unreachable(self) -> Dict[int, int]:
+        """删除从开始状态不可达的状态，把末尾的可达状态移入空出的编号，返回 {原编号: 新编号}"""
+        successors = defaultdict(list)
+        for (source, _), target in self.transitions.items():
+            successors[source].append(target)
+        reachable = {0}
+        stack = [0]
+        while stack:
+            for target in successors[stack.pop()]:
+                if target not in reachable:
+                    reachable.add(target)
+                    stack.append(target)
+        
+        count = len(reachable)
+        if count == len(self.states):
+            return {}
+        holes = [state_idx for state_idx in range(count) if state_idx not in reachable]
+        tail = [state_idx for state_idx in range(count, len(self.states)) if state_idx in reachable]
+        remap = dict(zip(tail, holes))
+        
+        for state_idx, state in enumerate(self.states):
+            if state_idx not in reachable:
+                del self.state_index[state]
+                self.action_table.pop(state_idx, None)
+                self.goto_table.pop(state_idx, None)
+        for old_idx, new_idx in remap.items():
+            state = self.states[new_idx] = self.states[old_idx]
+            self.state_index[state] = new_idx
+            if old_idx in self.action_table:
+                self.action_table[new_idx] = self.action_table.pop(old_idx)
+                self.goto_table[new_idx] = self.goto_table.pop(old_idx)
+        del self.states[count:]
+        self.transitions = {(remap.get(source, source), symbol): remap.get(target, target)
+                            for (source, symbol), target in self.transitions.items() if source in reachable}
+        self.conflicts = [(remap.get(state_idx, state_idx), symbol, kept, dropped)
+                          for state_idx, symbol, kept, dropped in self.conflicts if state_idx in reachable]
+        return remap
+    
+    def kernel(self, state) -> frozenset:
+        """状态的核心项集：圆点不在最左端的项及扩展开始产生式的项"""
+        return frozenset(item for item in state if item.dot > 0 or item.lhs == self.start_symbol)
+    
+    def invalidate_nonterminal(self, symbol) -> int:
+        """丢弃闭包中含有 symbol 的产生式项的缓存条目，返回丢弃的闭包数
 
+        丢弃的闭包记录在 stale_closures 中，rebuild_rows 只重新展开这些状态。
+        """
+        stale = {closure for closure in set(self.closure_cache.values())
+                 if any(item.lhs == symbol or item.next == symbol for item in closure)}
+        self.stale_closures.update(stale)
+        self.closure_cache = {kernel: closure for kernel, closure in self.closure_cache.items()
+                              if closure not in stale}
+        self.goto_cache = {key: result for key, result in self.goto_cache.items()
+                           if key[0] not in stale and result not in stale}
+        self.prediction_cache = {}
+        return len(stale)
 
-class SLRParserEngine:
-    """SLR语法分析引擎"""
+
+def semantic_id(lhs: str, rhs: List[str]) -> int:
+    """返回产生式在内置文法中的编号，用于选择语义动作"""
+    for idx, (default_lhs, default_rhs) in enumerate(DEFAULT_GRAMMAR_RULES):
+        if default_lhs == lhs and default_rhs == rhs:
+            return idx
+    return -1
+
+
+class ParseContext:
+    """一次语法分析的可变状态：中间代码、计数器、错误信息、符号表和值编号表
+
+    每次分析使用新的上下文，SLRParserEngine 本身只保存构建完成后只读的文法和分析表，
+    因此同一引擎可以被多个线程或 asyncio 任务同时使用。
+    """
     
-    def __init__(self):
-        self.grammar = Grammar()
-        self.parser = SLRParser(self.grammar, "P'")
-        self.debug = True
+    def __init__(self, source_name: str = "output.txt", debug: bool = False, build_tree: bool = False,
+                 check_semantics: bool = True, value_numbering: bool = True,
+                 temp_prefix: str = "t", label_prefix: str = "L"):
+        self.source_name = source_name  # 错误信息中使用的源文件名
+        self.temp_prefix = temp_prefix  # 临时变量名前缀
+        self.label_prefix = label_prefix  # 标签名前缀
+        self.debug = debug  # 是否打印分析过程
+        self.build_tree = build_tree  # 是否在归约时构建紧凑语法树
+        self.check_semantics = check_semantics  # 是否维护符号表并检查声明与使用
+        self.value_numbering = value_numbering  # 是否复用相同运算的临时变量
         self.intermediate_code = []  # 存储四元式
         self.temp_count = 0  # 临时变量计数
         self.label_count = 0  # 标签计数
         self.errors = []  # 存储错误信息
+        self.value_table = {}  # (运算符, 操作数, 操作数) -> 临时变量
+        self.value_uses = defaultdict(list)  # 操作数 -> 以其为操作数的 value_table 键
+        self.symbols = SymbolTable()  # 符号表
+        self.tree = None  # 语法树（SLR_tree.ParseTree）
+        self.accepted = False  # 是否到达接受状态（没有语法错误，可能仍有语义错误）
+        self.success = False  # 分析是否成功（没有语法错误和语义错误）
     
     def new_temp(self):
         """生成新的临时变量"""
         self.temp_count += 1
-        return f"t{self.temp_count}"
+        return f"{self.temp_prefix}{self.temp_count}"
     
     def new_label(self):
         """生成新标签"""
         self.label_count += 1
-        return f"L{self.label_count}"
+        return f"{self.label_prefix}{self.label_count}"
+    
+    def emit_binary(self, op: str, e1: str, e2: str) -> str:
+        """生成二元运算四元式；相同运算且操作数未被重新赋值时直接复用已有临时变量"""
+        if not self.value_numbering:
+            temp = self.new_temp()
+            self.intermediate_code.append((op, e1, e2, temp))
+            return temp
+        
+        a, b = str(e1), str(e2)
+        key = (op, a, b) if a <= b else (op, b, a)  # + 和 * 满足交换律
+        temp = self.value_table.get(key)
+        if temp is not None:
+            return temp
+        
+        temp = self.new_temp()
+        self.intermediate_code.append((op, e1, e2, temp))
+        self.value_table[key] = temp
+        self.value_uses[a].append(key)
+        if b != a:
+            self.value_uses[b].append(key)
+        return temp
+    
+    def invalidate_value(self, var: str):
+        """变量被赋值后，以其为操作数的已编号运算失效"""
+        for key in self.value_uses.pop(str(var), ()):
+            self.value_table.pop(key, None)
+    
+    def clear_values(self):
+        """在标签、函数调用和函数作用域边界处丢弃全部值编号"""
+        self.value_table.clear()
+        self.value_uses.clear()
+    
+    def check_symbols(self, sem_id: int, values: List[Any], positions: List[int],
+                      value_stack: List[Any], pos_stack: List[int], tokens: List[Tuple]):
+        """按产生式维护符号表；标识符的使用处替换为带符号信息的操作数"""
+        symbols = self.symbols
+        if sem_id == 4 or sem_id == 5:  # D -> T d / D -> T d [ i ]
+            self.declare_symbol(values[1], values[0], "var" if sem_id == 4 else "array", tokens[positions[1]])
+        elif sem_id == 9:  # N -> ε：形参表开始，先在外层声明函数名，再进入函数作用域
+            self.declare_symbol(value_stack[-2], value_stack[-3], "func", tokens[pos_stack[-2]])
+            symbols.enter_scope()
+        elif sem_id == 6:  # D -> T d ( N ) { C Q }
+            symbols.exit_scope()
+        elif sem_id == 11 or sem_id == 13:  # A -> T d / A -> T d ( )
+            self.declare_symbol(values[1], values[0], "param" if sem_id == 11 else "param_func", tokens[positions[1]])
+        elif sem_id == 12:  # A -> d [ ]
+            self.declare_symbol(values[0], None, "param_array", tokens[positions[0]])
+        elif sem_id in (16, 22, 27, 29, 30, 38, 39):  # 以 d 开头的使用处
+            name = values[0]
+            symbol = symbols.lookup(name)
+            if symbol is None:
+                self.errors.append(
+                    f"{format_location(self.source_name, tokens[positions[0]])}: 错误：未声明的标识符 '{name}'")
+            else:
+                values[0] = SymbolOperand(name, symbol)
+    
+    def declare_symbol(self, name: str, type_: Optional[str], kind: str, token: Tuple):
+        """在当前作用域声明标识符，重复声明时记录错误"""
+        symbol, is_new = self.symbols.declare(name, type_, kind, token)
+        if not is_new:
+            self.errors.append(
+                f"{format_location(self.source_name, token)}: 错误：重复声明的标识符 '{name}' "
+                f"(先前声明于 {format_location(self.source_name, symbol.token)})")
+
+
+class SLRParserEngine:
+    """SLR语法分析引擎
+
+    引擎只持有只读的文法、分析表和默认选项；每次分析的状态保存在 ParseContext 中。
+    `run` 不修改引擎，可并发调用；`parse` 为兼容接口，会把结果同步到引擎的属性上。
+    """
+    
+    def __init__(self, parser: Optional["SLRParser"] = None):
+        if parser is None:
+            parser = SLRParser(Grammar(), "P'")
+        self.grammar = parser.grammar
+        self.parser = parser
+        # 产生式编号 -> 内置文法中的编号，语义动作按产生式内容匹配，不在内置文法中的为 -1
+        self.semantic_ids = [semantic_id(lhs, rhs) for lhs, rhs in self.grammar.productions_list]
+        # 默认选项，由 new_context 复制到每次分析的上下文中
+        self.debug = True
+        self.source_name = "output.txt"  # 错误信息中使用的源文件名
+        self.build_tree = False  # 是否在归约时构建紧凑语法树
+        self.check_semantics = True  # 是否在分析时维护符号表并检查声明与使用
+        self.value_numbering = True  # 是否在归约时复用相同运算的临时变量
+        # 兼容属性：最近一次 parse 的结果
+        self.intermediate_code = []  # 存储四元式
+        self.temp_count = 0  # 临时变量计数
+        self.label_count = 0  # 标签计数
+        self.errors = []  # 存储错误信息
+        self.token_errors = []  # parse_tokens 产生、尚未并入 parse 结果的错误
+        self.symbols = SymbolTable()  # 最近一次分析的符号表
+        self.tree = None  # 最近一次分析得到的语法树（SLR_tree.ParseTree）
+        self.accepted = False  # 最近一次分析是否没有语法错误
+    
+    def new_context(self, **options) -> ParseContext:
+        """以引擎的默认选项创建分析上下文，options 可覆盖单个选项"""
+        settings = {
+            "source_name": self.source_name,
+            "debug": self.debug,
+            "build_tree": self.build_tree,
+            "check_semantics": self.check_semantics,
+            "value_numbering": self.value_numbering,
+        }
+        settings.update(options)
+        return ParseContext(**settings)
     
     def parse_tokens(self, token_lines: List[str]) -> List[Tuple[str, str, int]]:
         """解析token行，增加行号跟踪"""
-        tokens = []
-        for line_num, line in enumerate(token_lines, 1):
-            line = line.strip()
-            if not line:
-                continue
-            
-            if line.startswith('(') and line.endswith(')'):
-                content = line[1:-1]
-                comma_pos = content.find(', ')
-                if comma_pos != -1:
-                    token_type = content[:comma_pos].strip()
-                    token_val = content[comma_pos + 2:].strip()
-                    tokens.append((token_type, token_val, line_num))
-                    continue
-            
-            self.errors.append(f"output.txt:{line_num}: 错误：无效的token格式：{line}")
-        
-        if not tokens or tokens[-1][0] != "$":
-            tokens.append(("$", "$", len(token_lines) + 1))
+        tokens, errors = split_token_lines(token_lines, self.source_name)
+        self.token_errors = errors
+        self.errors = list(errors)
         return tokens
     
     def parse(self, tokens: List[Tuple[str, str, int]]) -> bool:
-        """执行SLR语法分析"""
-        if self.debug:
+        """执行SLR语法分析，结果保存在 intermediate_code、errors 等属性中"""
+        context = self.run(tokens)
+        self.intermediate_code = context.intermediate_code
+        self.temp_count = context.temp_count
+        self.label_count = context.label_count
+        self.errors = self.token_errors + context.errors
+        self.token_errors = []
+        self.symbols = context.symbols
+        self.tree = context.tree
+        self.accepted = context.accepted
+        return context.success
+    
+    def run(self, tokens: List[Tuple[str, str, int]], context: Optional[ParseContext] = None) -> ParseContext:
+        """在新的（或给定的）上下文中分析token序列，不修改引擎状态"""
+        if context is None:
+            context = self.new_context()
+        context.success = self.parse_with_context(tokens, context)
+        return context
+    
+    def parse_many(self, token_streams: List[List[Tuple[str, str, int]]],
+                   max_workers: Optional[int] = None, **options) -> List[ParseContext]:
+        """用线程池并发分析多个token序列，按输入顺序返回各自的上下文"""
+        options.setdefault("debug", False)
+        if max_workers == 1 or len(token_streams) <= 1:
+            return [self.run(tokens, self.new_context(**options)) for tokens in token_streams]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda tokens: self.run(tokens, self.new_context(**options)), token_streams))
+    
+    async def parse_async(self, tokens: List[Tuple[str, str, int]], **options) -> ParseContext:
+        """在默认线程池中分析，供 asyncio 任务使用"""
+        options.setdefault("debug", False)
+        context = self.new_context(**options)
+        return await asyncio.get_running_loop().run_in_executor(None, self.run, tokens, context)
+    
+    def reduce_semantics(self, context: ParseContext, sem_id: int, lhs: str, popped_values: List[Any],
+                         popped_positions: List[int], value_stack: List[Any], pos_stack: List[int],
+                         tokens: List[Tuple]) -> Any:
+        """执行一次归约的语义动作（符号表检查与中间代码生成），返回左部符号的语义值"""
+        # 语义检查：记录声明，检查标识符的使用
+        if context.check_semantics:
+            context.check_symbols(sem_id, popped_values, popped_positions, value_stack, pos_stack, tokens)
+        
+        # 生成中间代码
+        if lhs == "E":
+            if sem_id == 27:  # E -> d = E
+                var, _, expr = popped_values
+                context.intermediate_code.append(("=", expr, None, var))
+                context.invalidate_value(var)
+                return var
+            elif sem_id == 28:  # E -> i
+                return popped_values[0]
+            elif sem_id == 29:  # E -> d
+                return popped_values[0]
+            elif sem_id == 30:  # E -> d ( M )
+                context.clear_values()
+                return popped_values[0]
+            elif sem_id == 31:  # E -> E + E
+                e1, _, e2 = popped_values
+                return context.emit_binary("+", e1, e2)
+            elif sem_id == 32:  # E -> E * E
+                e1, _, e2 = popped_values
+                return context.emit_binary("*", e1, e2)
+            elif sem_id == 33:  # E -> ( E )
+                return popped_values[1]
+            elif sem_id == 34:  # E -> E ? E : E
+                cond, _, true_val, _, false_val = popped_values
+                result = context.new_temp()
+                true_label = context.new_label()
+                end_label = context.new_label()
+                context.intermediate_code.append(("if", cond, None, true_label))
+                context.intermediate_code.append(("=", false_val, None, result))
+                context.intermediate_code.append(("goto", None, None, end_label))
+                context.intermediate_code.append(("label", true_label, None, None))
+                context.intermediate_code.append(("=", true_val, None, result))
+                context.intermediate_code.append(("label", end_label, None, None))
+                context.clear_values()
+                return result
+        elif lhs == "S" and sem_id == 16:  # S -> d = E
+            var, _, expr = popped_values
+            context.intermediate_code.append(("=", expr, None, var))
+            context.invalidate_value(var)
+            return ""
+        elif lhs == "S" and sem_id == 20:  # S -> return E
+            expr = popped_values[1]
+            context.intermediate_code.append(("return", expr, None, None))
+            return ""
+        elif lhs == "T":  # T -> int / void，类型名供声明使用
+            return popped_values[0]
+        elif sem_id == 6 or sem_id == 9 or sem_id == 22:  # 函数作用域边界、函数调用语句
+            context.clear_values()
+        return ""
+    
+    def syntax_error(self, context: ParseContext, tokens: List[Tuple], token_index: int, expected) -> bool:
+        """记录类似g++的语法错误信息（expected 为当前状态可接受的终结符），返回 False；
+        token序列未以 `$` 结尾而耗尽时不记录"""
+        if token_index >= len(tokens):
+            return False
+        token_val = tokens[token_index][1]
+        expected = sorted(expected)
+        expected_str = ", ".join(f"'{s}'" for s in expected) if expected else "无"
+        context_str = " ".join(t[1] for t in tokens[max(0, token_index - 2):token_index + 3])
+        context.errors.append(
+            f"{format_location(context.source_name, tokens[token_index])}: 错误：在 '{token_val}' 处发生语法错误 "
+            f"(期望的符号：{expected_str})\n"
+            f"    上下文：... {context_str} ..."
+        )
+        return False
+    
+    def parse_with_context(self, tokens: List[Tuple[str, str, int]], context: ParseContext,
+                           start_states: Optional[List[int]] = None, start_symbols: Optional[List[str]] = None,
+                           stop_states: Optional[List[int]] = None) -> bool:
+        """执行SLR语法分析的主循环
+
+        start_states/start_symbols 指定初始状态栈和符号栈（用于从中间状态分析一段token）；
+        给定 stop_states 时，除最后一个向前看token外的token全部移进、且归约后状态栈等于 stop_states 即成功返回。
+        """
+        if context.debug:
             print("\n=== 映射后的终结符序列 ===")
-            for i, (token_type, token_val, line_num) in enumerate(tokens):
+            for i, (token_type, token_val, line_num, *_) in enumerate(tokens):
                 mapped = TokenMapper.map_token_to_symbol(token_type, token_val)
                 print(f"{i:2d}: ({token_type:8}, {token_val:10}, 行 {line_num}) -> '{mapped}'")
         
-        state_stack = [0]
-        symbol_stack = []
-        value_stack = []
+        state_stack = list(start_states) if start_states else [0]
+        symbol_stack = list(start_symbols) if start_symbols else []
+        value_stack = [""] * len(symbol_stack)
+        pos_stack = [0] * len(symbol_stack)  # 每个栈符号的第一个token下标
+        error_count = len(context.errors)
+        tree = None
+        node_stack = []
+        if context.build_tree and not symbol_stack:  # 从中间状态开始分析时不构建语法树
+            from SLR_tree import ParseTree
+            tree = ParseTree(self.grammar.productions_list, tokens)
+        context.tree = tree
         token_index = 0
         step = 0
         
-        if self.debug:
+        if context.debug:
             print(f"\n=== 语法分析过程 ===")
             print(f"{'步骤':<4} {'状态栈':<20} {'符号栈':<25} {'输入':<20} {'动作':<15} {'中间代码':<30}")
             print("-" * 110)
         
         while token_index < len(tokens):
             current_state = state_stack[-1]
-            token_type, token_val, line_num = tokens[token_index]
+            token_type, token_val, line_num = tokens[token_index][:3]
             current_symbol = TokenMapper.map_token_to_symbol(token_type, token_val)
             
             action = self.parser.action_table[current_state].get(current_symbol)
             
             code_gen = ""
             
-            if self.debug:
+            if context.debug:
                 state_str = str(state_stack)
                 symbol_str = str(symbol_stack)
                 input_str = f"{current_symbol}({token_val})"
@@ -415,89 +1048,48 @@ class SLRParserEngine:
                 step += 1
             
             if action is None:
-                # 生成类似g++的错误信息
-                expected = sorted(self.parser.action_table[current_state].keys())
-                expected_str = ", ".join(f"'{s}'" for s in expected) if expected else "无"
-                context = " ".join(t[1] for t in tokens[max(0, token_index - 2):token_index + 3])
-                self.errors.append(
-                    f"output.txt:{line_num}: 错误：在 '{token_val}' 处发生语法错误 "
-                    f"(期望的符号：{expected_str})\n"
-                    f"    上下文：... {context} ..."
-                )
-                return False
+                return self.syntax_error(context, tokens, token_index, self.parser.action_table[current_state].keys())
             
             if action.startswith("s"):  # 移进
                 next_state = int(action[1:])
                 state_stack.append(next_state)
                 symbol_stack.append(current_symbol)
                 value_stack.append(token_val)
+                pos_stack.append(token_index)
+                if tree is not None:
+                    node_stack.append(tree.add_leaf(token_index))
                 token_index += 1
             
             elif action.startswith("r"):  # 归约
                 prod_idx = int(action[1:])
                 lhs, rhs = self.grammar.productions_list[prod_idx]
                 
-                if self.debug:
+                if context.debug:
                     print(f"    归约使用产生式 {prod_idx}: {lhs} -> {' '.join(rhs)}")
                 
                 pop_count = 0 if rhs == ['ε'] else len(rhs)
                 popped_values = []
+                popped_positions = []
                 
                 if pop_count > 0:
                     popped_values = value_stack[-pop_count:]
+                    popped_positions = pos_stack[-pop_count:]
                     del state_stack[-pop_count:]
                     del symbol_stack[-pop_count:]
                     del value_stack[-pop_count:]
+                    del pos_stack[-pop_count:]
                 
-                # 生成中间代码
-                if lhs == "E":
-                    if prod_idx == 27:  # E -> d = E
-                        var, _, expr = popped_values
-                        self.intermediate_code.append(("=", expr, None, var))
-                        value_stack.append(var)
-                    elif prod_idx == 28:  # E -> i
-                        value_stack.append(popped_values[0])
-                    elif prod_idx == 29:  # E -> d
-                        value_stack.append(popped_values[0])
-                    elif prod_idx == 30:  # E -> d ( M )
-                        value_stack.append(popped_values[0])
-                    elif prod_idx == 31:  # E -> E + E
-                        e1, _, e2 = popped_values
-                        temp = self.new_temp()
-                        self.intermediate_code.append(("+", e1, e2, temp))
-                        value_stack.append(temp)
-                    elif prod_idx == 32:  # E -> E * E
-                        e1, _, e2 = popped_values
-                        temp = self.new_temp()
-                        self.intermediate_code.append(("*", e1, e2, temp))
-                        value_stack.append(temp)
-                    elif prod_idx == 33:  # E -> ( E )
-                        value_stack.append(popped_values[1])
-                    elif prod_idx == 34:  # E -> E ? E : E
-                        cond, _, true_val, _, false_val = popped_values
-                        result = self.new_temp()
-                        true_label = self.new_label()
-                        false_label = self.new_label()
-                        end_label = self.new_label()
-                        self.intermediate_code.append(("if", cond, None, true_label))
-                        self.intermediate_code.append(("=", true_val, None, result))
-                        self.intermediate_code.append(("goto", None, None, end_label))
-                        self.intermediate_code.append(("label", false_label, None, None))
-                        self.intermediate_code.append(("=", false_val, None, result))
-                        self.intermediate_code.append(("label", end_label, None, None))
-                        value_stack.append(result)
-                elif lhs == "S" and prod_idx == 16:  # S -> d = E
-                    var, _, expr = popped_values
-                    self.intermediate_code.append(("=", expr, None, var))
-                    value_stack.append("")
-                elif lhs == "S" and prod_idx == 20:  # S -> return E
-                    expr = popped_values[1]
-                    self.intermediate_code.append(("return", expr, None, None))
-                    value_stack.append("")
-                else:
-                    value_stack.append("")
+                if tree is not None:
+                    child_nodes = node_stack[-pop_count:] if pop_count > 0 else []
+                    if pop_count > 0:
+                        del node_stack[-pop_count:]
+                    node_stack.append(tree.add_node(prod_idx, child_nodes, token_index))
                 
+                value_stack.append(self.reduce_semantics(
+                    context, self.semantic_ids[prod_idx], lhs, popped_values, popped_positions,
+                    value_stack, pos_stack, tokens))
                 symbol_stack.append(lhs)
+                pos_stack.append(popped_positions[0] if popped_positions else token_index)
                 
                 current_state = state_stack[-1]
                 goto_state = self.parser.goto_table[current_state].get(lhs)
@@ -505,26 +1097,32 @@ class SLRParserEngine:
                 if goto_state is None:
                     expected = sorted(self.parser.goto_table[current_state].keys())
                     expected_str = ", ".join(f"'{s}'" for s in expected) if expected else "无"
-                    context = " ".join(t[1] for t in tokens[max(0, token_index - 2):token_index + 3])
-                    self.errors.append(
-                        f"output.txt:{line_num}: 错误：非终结符 '{lhs}' 状态转移无效 "
+                    context_str = " ".join(t[1] for t in tokens[max(0, token_index - 2):token_index + 3])
+                    context.errors.append(
+                        f"{format_location(context.source_name, tokens[token_index])}: 错误：非终结符 '{lhs}' 状态转移无效 "
                         f"(期望的符号：{expected_str})\n"
-                        f"    上下文：... {context} ..."
+                        f"    上下文：... {context_str} ..."
                     )
                     return False
                 
                 state_stack.append(goto_state)
+                
+                if stop_states is not None and token_index == len(tokens) - 1 and state_stack == stop_states:
+                    return len(context.errors) == error_count
             
             elif action == "acc":
-                if self.debug:
+                context.accepted = True
+                if tree is not None and node_stack:
+                    tree.root = node_stack[-1]
+                if context.debug:
                     print("\n=== 分析成功！ ===")
                     print("\n=== 中间代码（四元式） ===")
-                    for i, quad in enumerate(self.intermediate_code, 1):
+                    for i, quad in enumerate(context.intermediate_code, 1):
                         print(f"{i:2d}: {quad}")
-                return True
+                return len(context.errors) == error_count
             
             else:
-                self.errors.append(f"output.txt:{line_num}: 错误：未知动作 '{action}'")
+                context.errors.append(f"{format_location(context.source_name, tokens[token_index])}: 错误：未知动作 '{action}'")
                 return False
         
         return False
@@ -546,6 +1144,12 @@ def main():
         
         if success:
             print("\n语法分析成功！程序符合语法规范。")
+        elif engine.accepted:
+            print("\n语义检查失败！程序符合语法规范，但存在语义错误。")
+            print("\n=== 错误信息 ===")
+            for error in engine.errors:
+                print(error)
+            print(f"\n共发现 {len(engine.errors)} 个错误")
         else:
             print("\n语法分析失败！程序存在语法错误。")
             if engine.errors:
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from SLR_parser import Grammar, SLRParser, TokenMapper, format_location, split_token_lines
+
+
+class SLRRecognizer:
+    """只做语法识别的快速校验器：仅维护状态栈，不生成中间代码"""
+
+    ACCEPT = 0  # 编码后的接受动作
+
+    def __init__(self, parser: Optional[SLRParser] = None):
+        if parser is None:
+            parser = SLRParser(Grammar(), "P'")
+        self.parser = parser
+        self.rows = {}  # 状态 -> 编码后的ACTION行（移进 n+1，归约 -(产生式+1)，接受 0）
+        self.reductions = [(0 if rhs == ['ε'] else len(rhs), lhs)
+                           for lhs, rhs in parser.grammar.productions_list]
+
+    def encode_row(self, state: int) -> Dict[str, int]:
+        """将ACTION表的一行编码为整数动作，首次访问该状态时调用"""
+        row = {}
+        for symbol, action in self.parser.action_table[state].items():
+            if action == "acc":
+                row[symbol] = self.ACCEPT
+            elif action.startswith("s"):
+                row[symbol] = int(action[1:]) + 1
+            else:
+                row[symbol] = -(int(action[1:]) + 1)
+        self.rows[state] = row
+        return row
+
+    def recognize(self, tokens: List[Tuple[str, str, int]], source_name: str = "output.txt") -> List[str]:
+        """识别token序列，返回诊断信息列表（为空表示符合语法）"""
+        token_map = TokenMapper.TOKEN_MAP
+        symbols = [token_map.get(token[0], token[1]) for token in tokens]
+        symbols.append(None)  # 哨兵：token序列未以 `$` 结尾时在此处报错
+        rows = self.rows
+        goto_table = self.parser.goto_table
+        reductions = self.reductions
+
+        state_stack = [0]
+        token_index = 0
+        symbol = symbols[0]
+
+        while True:
+            state = state_stack[-1]
+            row = rows.get(state)
+            if row is None:
+                row = self.encode_row(state)
+            action = row.get(symbol)
+
+            if action is None:
+                if token_index >= len(tokens):
+                    return [f"{source_name}: 错误：token序列在结束符 '$' 之前结束"]
+                token_val = tokens[token_index][1]
+                expected = sorted(row)
+                expected_str = ", ".join(f"'{s}'" for s in expected) if expected else "无"
+                context = " ".join(t[1] for t in tokens[max(0, token_index - 2):token_index + 3])
+                return [
+                    f"{format_location(source_name, tokens[token_index])}: 错误：在 '{token_val}' 处发生语法错误 "
+                    f"(期望的符号：{expected_str})\n"
+                    f"    上下文：... {context} ..."
+                ]
+
+            if action > 0:  # 移进
+                state_stack.append(action - 1)
+                token_index += 1
+                symbol = symbols[token_index]
+            elif action < 0:  # 归约
+                pop_count, lhs = reductions[-action - 1]
+                if pop_count:
+                    del state_stack[-pop_count:]
+                goto_state = goto_table[state_stack[-1]].get(lhs)
+                if goto_state is None:
+                    expected = sorted(goto_table[state_stack[-1]])
+                    expected_str = ", ".join(f"'{s}'" for s in expected) if expected else "无"
+                    context = " ".join(t[1] for t in tokens[max(0, token_index - 2):token_index + 3])
+                    return [
+                        f"{format_location(source_name, tokens[token_index])}: 错误：非终结符 '{lhs}' 状态转移无效 "
+                        f"(期望的符号：{expected_str})\n"
+                        f"    上下文：... {context} ..."
+                    ]
+                state_stack.append(goto_state)
+            else:  # 接受
+                return []
+
+    def recognize_lines(self, token_lines: List[str], source_name: str = "output.txt") -> List[str]:
+        """识别 `(类型, 值)` 格式的token行"""
+        tokens, errors = split_token_lines(token_lines, source_name)
+        if errors:
+            return errors
+        return self.recognize(tokens, source_name)
+
+    def recognize_files(self, paths: Iterable[str]) -> Dict[str, List[str]]:
+        """批量识别多个token文件，返回 文件 -> 诊断信息 的字典"""
+        results = {}
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    token_lines = f.readlines()
+            except OSError as e:
+                results[path] = [f"{path}: 错误：无法读取文件：{e}"]
+                continue
+            results[path] = self.recognize_lines(token_lines, path)
+        return results
+
+
+def main(argv: List[str]) -> int:
+    """命令行入口：校验给定的token文件，存在错误时返回 1"""
+    paths = argv or ["output.txt"]
+    recognizer = SLRRecognizer()
+    results = recognizer.recognize_files(paths)
+
+    error_count = 0
+    for path, diagnostics in results.items():
+        for diagnostic in diagnostics:
+            print(diagnostic)
+        error_count += len(diagnostics)
+
+    if error_count:
+        print(f"\n共发现 {error_count} 个错误（{len(paths)} 个文件）")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+from SLR_parser import TokenMapper
+
+LEAF = -1  # 叶子结点（终结符）的产生式编号
+
+
+class ParseTree:
+    """紧凑语法树：结点以平铺数组保存，不为每个结点创建Python对象
+
+    对每个结点 n：
+        prods[n]   产生式编号，叶子为 LEAF
+        firsts[n]  叶子为token下标，内部结点为其孩子在 children 中的起始位置
+        counts[n]  孩子个数
+        starts[n], ends[n]  覆盖的token区间 [start, end)
+    """
+
+    def __init__(self, productions_list: List[Tuple[str, List[str]]], tokens: List[Tuple[str, str, int]]):
+        self.productions_list = productions_list
+        self.tokens = tokens
+        self.prods = array('i')
+        self.firsts = array('i')
+        self.counts = array('i')
+        self.starts = array('i')
+        self.ends = array('i')
+        self.children = array('i')  # 所有内部结点的孩子编号，按结点连续存放
+        self.root = -1
+
+    def __len__(self):
+        return len(self.prods)
+
+    def add_leaf(self, token_index: int) -> int:
+        """移进时记录叶子结点，返回结点编号"""
+        self.prods.append(LEAF)
+        self.firsts.append(token_index)
+        self.counts.append(0)
+        self.starts.append(token_index)
+        self.ends.append(token_index + 1)
+        return len(self.prods) - 1
+
+    def add_node(self, prod_idx: int, child_nodes: List[int], token_index: int) -> int:
+        """归约时记录内部结点，token_index 为空产生式的位置"""
+        self.prods.append(prod_idx)
+        self.firsts.append(len(self.children))
+        self.counts.append(len(child_nodes))
+        if child_nodes:
+            self.starts.append(self.starts[child_nodes[0]])
+            self.ends.append(self.ends[child_nodes[-1]])
+            self.children.extend(child_nodes)
+        else:
+            self.starts.append(token_index)
+            self.ends.append(token_index)
+        return len(self.prods) - 1
+
+    def node(self, index: int) -> "NodeView":
+        """按需创建结点视图"""
+        return NodeView(self, index)
+
+    def root_node(self) -> Optional["NodeView"]:
+        return NodeView(self, self.root) if self.root >= 0 else None
+
+    def find(self, lhs: str) -> Iterator["NodeView"]:
+        """按出现顺序遍历所有左部为 lhs 的结点"""
+        productions_list = self.productions_list
+        for index, prod_idx in enumerate(self.prods):
+            if prod_idx != LEAF and productions_list[prod_idx][0] == lhs:
+                yield NodeView(self, index)
+
+
+class NodeView:
+    """语法树结点的轻量视图，仅在访问时创建"""
+
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree: ParseTree, index: int):
+        self.tree = tree
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, NodeView) and (self.tree, self.index) == (other.tree, other.index)
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    def __repr__(self):
+        if self.is_leaf:
+            return f"<{self.symbol} '{self.text}' @{self.start}>"
+        return f"<{self.symbol} r{self.production} [{self.start}, {self.end})>"
+
+    @property
+    def production(self) -> int:
+        return self.tree.prods[self.index]
+
+    @property
+    def is_leaf(self) -> bool:
+        return self.tree.prods[self.index] == LEAF
+
+    @property
+    def symbol(self) -> str:
+        """结点的文法符号：内部结点为产生式左部，叶子为映射后的终结符"""
+        tree = self.tree
+        prod_idx = tree.prods[self.index]
+        if prod_idx == LEAF:
+            token_type, token_val = tree.tokens[tree.firsts[self.index]][:2]
+            return TokenMapper.map_token_to_symbol(token_type, token_val)
+        return tree.productions_list[prod_idx][0]
+
+    @property
+    def start(self) -> int:
+        return self.tree.starts[self.index]
+
+    @property
+    def end(self) -> int:
+        return self.tree.ends[self.index]
+
+    @property
+    def text(self) -> str:
+        """结点覆盖的token文本"""
+        return " ".join(token[1] for token in self.tree.tokens[self.start:self.end])
+
+    @property
+    def line(self) -> Optional[int]:
+        """结点第一个token的行号，空产生式返回 None"""
+        if self.start == self.end:
+            return None
+        return self.tree.tokens[self.start][2]
+
+    @property
+    def children(self) -> List["NodeView"]:
+        tree = self.tree
+        first = tree.firsts[self.index]
+        if tree.prods[self.index] == LEAF:
+            return []
+        return [NodeView(tree, child) for child in tree.children[first:first + tree.counts[self.index]]]
+
+    def walk(self) -> Iterator["NodeView"]:
+        """先序遍历以该结点为根的子树"""
+        stack = [self.index]
+        tree = self.tree
+        while stack:
+            index = stack.pop()
+            yield NodeView(tree, index)
+            if tree.prods[index] != LEAF:
+                first = tree.firsts[index]
+                stack.extend(reversed(tree.children[first:first + tree.counts[index]]))
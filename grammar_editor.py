@@ -0,0 +1,436 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Set, Tuple
+
+from SLR_parser import Grammar, SLRParser
+
+# 计时检查使用的修改：从表达式到声明，涉及的状态由多到少
+BENCHMARK_EDITS = [
+    ("E", ["E", "-", "E"]),
+    ("E", ["-", "E"]),
+    ("B", ["¬", "B"]),
+    ("S", ["do", "S", "while", "(", "B", ")"]),
+    ("T", ["char"]),
+    ("R", ["i"]),
+    ("A", ["T", "d", "[", "]"]),
+]
+MIN_SPEEDUP = 1.5  # 修改的平均耗时至少应比完整构建快这么多倍
+
+
+class EditReport:
+    """一次文法修改的结果：新增和消失的冲突、受影响的符号及耗时"""
+
+    def __init__(self, added_conflicts: List[str], removed_conflicts: List[str],
+                 first_changed: Set[str], follow_changed: Set[str], invalidated_states: int, rebuilt_rows: int,
+                 elapsed: float):
+        self.added_conflicts = added_conflicts
+        self.removed_conflicts = removed_conflicts
+        self.first_changed = first_changed
+        self.follow_changed = follow_changed
+        self.invalidated_states = invalidated_states  # 丢弃的闭包缓存条目数
+        self.rebuilt_rows = rebuilt_rows  # 重建的ACTION/GOTO行数，其余行沿用修改前的结果
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return (f"EditReport(+{len(self.added_conflicts)} 冲突, -{len(self.removed_conflicts)} 冲突, "
+                f"{self.invalidated_states} 个闭包失效, {self.rebuilt_rows} 行重建, {self.elapsed * 1000:.1f} ms)")
+
+    def format(self) -> str:
+        lines = [repr(self)]
+        lines.extend(f"  + {conflict}" for conflict in self.added_conflicts)
+        lines.extend(f"  - {conflict}" for conflict in self.removed_conflicts)
+        return "\n".join(lines)
+
+
+class GrammarEditor:
+    """增量修改文法
+
+    每次添加或删除一条产生式后，只重新计算受影响的非终结符的 FIRST/FOLLOW 集，
+    只重新展开闭包涉及被修改非终结符的状态和新出现的状态，其余状态的项集、转移和编号保持不变，
+    只重建受影响的 ACTION/GOTO 行（见 SLRParser.rebuild_rows），并以冲突差异的形式报告修改对分析表的影响。
+    除状态编号外结果与重新完整构建相同，可用 verify_against_fresh_build 校验。
+    """
+
+    def __init__(self, parser: SLRParser):
+        self.parser = parser
+        self.grammar = parser.grammar
+
+    # ---------- 对外接口 ----------
+
+    def add_production(self, lhs: str, rhs: List[str]) -> EditReport:
+        return self.apply_edit(lhs, list(rhs), remove=False)
+
+    def remove_production(self, lhs: str, rhs: List[str]) -> EditReport:
+        return self.apply_edit(lhs, list(rhs), remove=True)
+
+    # ---------- 实现 ----------
+
+    def conflict_keys(self) -> Counter:
+        """将冲突表示为与状态编号无关的形式：(符号, 冲突的动作) 的多重集
+
+        动作只描述真正相互冲突的部分：移进为以该符号为下一符号的项，归约为所用的产生式，
+        因此状态中增加或减少无关的项不会改变冲突的表示。
+        """
+        keys = Counter()
+        for state_idx, symbol, kept, dropped in self.parser.conflicts:
+            actions = frozenset((self.describe_action(state_idx, symbol, kept),
+                                 self.describe_action(state_idx, symbol, dropped)))
+            keys[(symbol, actions)] += 1
+        return keys
+
+    def describe_action(self, state_idx: int, symbol: str, action: str) -> str:
+        if action.startswith("r"):
+            lhs, rhs = self.grammar.productions_list[int(action[1:])]
+            return f"归约 {lhs} -> {' '.join(rhs)}"
+        if action == "acc":
+            return "接受"
+        items = sorted(repr(item) for item in self.parser.states[state_idx] if item.next_symbol() == symbol)
+        return f"移进 [{'; '.join(items)}]"
+
+    @staticmethod
+    def format_conflict(key: Tuple) -> str:
+        symbol, actions = key
+        return f"在符号 '{symbol}' 上：{' / '.join(sorted(actions))}"
+
+    def apply_edit(self, lhs: str, rhs: List[str], remove: bool) -> EditReport:
+        start = time.perf_counter()
+        grammar = self.grammar
+        parser = self.parser
+        before = self.conflict_keys()
+        old_nonterminals = set(grammar.productions)
+
+        if remove:
+            grammar.remove_production(lhs, rhs)
+        else:
+            grammar.add_production(lhs, rhs)
+
+        # 终结符/非终结符身份发生变化的符号（新出现的左部或失去全部产生式的左部）
+        status_changed = old_nonterminals ^ set(grammar.productions)
+        first_changed = self.update_first(lhs, remove, status_changed)
+        follow_changed = self.update_follow(rhs, first_changed | status_changed, status_changed)
+
+        invalidated = 0
+        for symbol in {lhs} | status_changed:
+            invalidated += parser.invalidate_nonterminal(symbol)
+
+        report_conflicts = parser.report_conflicts
+        parser.report_conflicts = False
+        try:
+            rebuilt_rows = parser.rebuild_rows(follow_changed, status_changed)
+        finally:
+            parser.report_conflicts = report_conflicts
+
+        after = self.conflict_keys()
+        return EditReport(
+            sorted(self.format_conflict(key) for key in (after - before).elements()),
+            sorted(self.format_conflict(key) for key in (before - after).elements()),
+            first_changed, follow_changed, invalidated, rebuilt_rows, time.perf_counter() - start)
+
+    def users(self) -> Dict[str, Set[str]]:
+        """符号 -> 右部中出现该符号的产生式左部"""
+        users = defaultdict(set)
+        for lhs, rhs in self.grammar.productions_list:
+            for symbol in rhs:
+                users[symbol].add(lhs)
+        return users
+
+    def first_of_productions(self, symbol: str) -> Set[str]:
+        """按当前 FIRST 集计算非终结符 symbol 的 FIRST 集"""
+        first = self.grammar.first
+        result = set()
+        for rhs in self.grammar.productions[symbol]:
+            if rhs == ['ε']:
+                result.add('ε')
+                continue
+            all_have_epsilon = True
+            for sym in rhs:
+                result.update(first[sym] - {'ε'})
+                if 'ε' not in first[sym]:
+                    all_have_epsilon = False
+                    break
+            if all_have_epsilon:
+                result.add('ε')
+        return result
+
+    def update_first(self, lhs: str, remove: bool, status_changed: Set[str]) -> Set[str]:
+        """增量更新FIRST集，返回FIRST集发生变化的符号
+
+        添加产生式时FIRST集只会增大，从 lhs 出发沿“被引用”关系传播即可；
+        删除产生式时先清空所有（传递地）依赖 lhs 的非终结符，再只对它们求不动点。
+        """
+        grammar = self.grammar
+        first = grammar.first
+        users = self.users()
+        snapshot = {}
+
+        for symbol in status_changed:
+            snapshot[symbol] = set(first[symbol])
+            first[symbol] = {symbol} if symbol in grammar.terminals else set()
+        for terminal in grammar.terminals | {'ε'}:
+            if terminal not in first or not first[terminal]:
+                first[terminal] = {terminal}
+
+        seeds = {lhs} | status_changed
+        if remove or status_changed:
+            affected = set()
+            stack = list(seeds)
+            while stack:
+                symbol = stack.pop()
+                if symbol in affected:
+                    continue
+                affected.add(symbol)
+                stack.extend(users[symbol])
+            for symbol in affected:
+                if symbol in grammar.productions:
+                    snapshot.setdefault(symbol, set(first[symbol]))
+                    first[symbol] = set()
+            worklist = [symbol for symbol in affected if symbol in grammar.productions]
+        else:
+            worklist = [lhs]
+
+        while worklist:
+            symbol = worklist.pop()
+            if symbol not in grammar.productions:
+                continue
+            new_first = self.first_of_productions(symbol)
+            if new_first != first[symbol]:
+                snapshot.setdefault(symbol, set(first[symbol]))
+                first[symbol] = new_first
+                worklist.extend(users[symbol])
+
+        return {symbol for symbol, old in snapshot.items() if first[symbol] != old}
+
+    def update_follow(self, edited_rhs: List[str], first_changed: Set[str], status_changed: Set[str]) -> Set[str]:
+        """增量更新FOLLOW集，返回FOLLOW集发生变化的非终结符
+
+        直接受影响的是被修改产生式右部中的非终结符、新出现的非终结符，以及后继符号的FIRST集发生变化的非终结符；
+        再沿 FOLLOW(A) ⊆ FOLLOW(X) 的包含关系求出全部受影响者，清空后只对它们求不动点。
+        """
+        grammar = self.grammar
+        first = grammar.first
+        follow = grammar.follow
+        base = grammar.follow_base
+        productions = grammar.productions
+        start_symbol = self.parser.start_symbol
+
+        def nullable(symbols):
+            return all('ε' in first[sym] for sym in symbols)
+
+        # 右部中的非终结符，以及由终结符变为非终结符的符号（此前没有FOLLOW集）
+        direct = {sym for sym in edited_rhs if sym in productions}
+        direct.update(sym for sym in status_changed if sym in productions)
+        for symbol in status_changed:
+            if symbol not in productions:  # 变为终结符的符号不再有FOLLOW集
+                follow.pop(symbol, None)
+                base.pop(symbol, None)
+        inherits = defaultdict(set)  # A -> {X}：FOLLOW(A) ⊆ FOLLOW(X)
+        for lhs, rhs in grammar.productions_list:
+            for i, symbol in enumerate(rhs):
+                if symbol not in productions:
+                    continue
+                beta = rhs[i + 1:]
+                if any(sym in first_changed for sym in beta):
+                    direct.add(symbol)
+                if nullable(beta):
+                    inherits[lhs].add(symbol)
+
+        affected = set()
+        stack = list(direct)
+        while stack:
+            symbol = stack.pop()
+            if symbol in affected:
+                continue
+            affected.add(symbol)
+            stack.extend(inherits[symbol])
+
+        # 与 Grammar.compute_follow 一致：在不含 follow_extra 的集合上求不动点，最后再加入补充符号
+        snapshot = {symbol: set(follow[symbol]) for symbol in affected}
+        for symbol in affected:
+            base[symbol] = {'$'} if symbol == start_symbol else set()
+
+        relevant = [(lhs, rhs) for lhs, rhs in grammar.productions_list
+                    if any(sym in affected for sym in rhs)]
+        changed = True
+        while changed:
+            changed = False
+            for lhs, rhs in relevant:
+                for i, symbol in enumerate(rhs):
+                    if symbol not in affected:
+                        continue
+                    old_size = len(base[symbol])
+                    beta = rhs[i + 1:]
+                    for b_sym in beta:
+                        base[symbol].update(first[b_sym] - {'ε'})
+                        if 'ε' not in first[b_sym]:
+                            break
+                    else:
+                        base[symbol].update(base[lhs])
+                    if len(base[symbol]) > old_size:
+                        changed = True
+
+        for symbol in affected:
+            follow[symbol] = base[symbol] | set(grammar.follow_extra.get(symbol, ()))
+        return {symbol for symbol, old in snapshot.items() if follow[symbol] != old}
+
+
+def verify_against_fresh_build(parser: SLRParser) -> List[str]:
+    """将增量修改后的解析器与按当前产生式完整构建的解析器比较，返回差异描述（为空表示一致）
+
+    状态编号可以不同：两边的状态按项集一一对应后，比较 FIRST/FOLLOW 集、各状态的 ACTION/GOTO 行和冲突。
+    """
+    grammar = parser.grammar
+    fresh_grammar = Grammar(grammar.productions_list)
+    fresh_grammar.follow_extra = {symbol: set(extra) for symbol, extra in grammar.follow_extra.items()}
+    fresh_grammar.precedence = dict(grammar.precedence)
+    fresh = SLRParser(fresh_grammar, parser.start_symbol, lazy=parser.lazy, report_conflicts=False)
+    if parser.lazy:
+        parser.materialize_all()
+        fresh.materialize_all()
+
+    differences = []
+    if grammar.terminals != fresh_grammar.terminals:
+        differences.append(f"终结符集不同：{sorted(grammar.terminals ^ fresh_grammar.terminals)}")
+    for symbol in sorted(set(grammar.productions) | grammar.terminals):
+        if grammar.first[symbol] != fresh_grammar.first[symbol]:
+            differences.append(f"FIRST({symbol})：增量 {sorted(grammar.first[symbol])}，"
+                               f"完整构建 {sorted(fresh_grammar.first[symbol])}")
+    for symbol in sorted(grammar.productions):
+        if grammar.follow[symbol] != fresh_grammar.follow[symbol]:
+            differences.append(f"FOLLOW({symbol})：增量 {sorted(grammar.follow[symbol])}，"
+                               f"完整构建 {sorted(fresh_grammar.follow[symbol])}")
+    if len(parser.states) != len(fresh.states):
+        differences.append(f"状态数：增量 {len(parser.states)}，完整构建 {len(fresh.states)}")
+        return differences
+
+    # 增量修改保留原有状态的编号，按项集对应到完整构建的状态后再比较各行
+    mapping = {}
+    for state_idx, state in enumerate(parser.states):
+        fresh_idx = fresh.state_index.get(state)
+        if fresh_idx is None:
+            differences.append(f"状态 {state_idx} 的项集在完整构建中不存在")
+        else:
+            mapping[state_idx] = fresh_idx
+    if differences:
+        return differences
+    if mapping[0] != 0:
+        differences.append("开始状态的项集不同")
+
+    def translate(state_idx, action):
+        return f"s{mapping[int(action[1:])]}" if action.startswith("s") else action
+
+    for state_idx, fresh_idx in mapping.items():
+        actions = {symbol: translate(state_idx, action) for symbol, action in parser.action_table[state_idx].items()}
+        gotos = {symbol: mapping[target] for symbol, target in parser.goto_table[state_idx].items()}
+        if actions != fresh.action_table[fresh_idx]:
+            differences.append(f"状态 {state_idx}（完整构建中为 {fresh_idx}）的ACTION行不同")
+        elif gotos != fresh.goto_table[fresh_idx]:
+            differences.append(f"状态 {state_idx}（完整构建中为 {fresh_idx}）的GOTO行不同")
+    conflicts = Counter((mapping[state_idx], symbol, translate(state_idx, kept), dropped)
+                        for state_idx, symbol, kept, dropped in parser.conflicts)
+    if conflicts != Counter(fresh.conflicts):
+        differences.append("冲突列表不同")
+    return differences
+
+
+def random_edit(editor: GrammarEditor, rng: random.Random) -> Tuple[str, str, List[str]]:
+    """随机选取一次修改：删除一条已有产生式，或用现有符号（偶尔是新符号）添加一条产生式"""
+    grammar = editor.grammar
+    start_symbol = editor.parser.start_symbol
+    removable = [(lhs, rhs) for lhs, rhs in grammar.productions_list if lhs != start_symbol]
+    if removable and rng.random() < 0.5:
+        lhs, rhs = rng.choice(removable)
+        return "remove", lhs, list(rhs)
+    symbols = sorted((set(grammar.productions) | grammar.terminals) - {start_symbol, '$'}) + ["X", "Y"]
+    lhs = rng.choice(symbols)
+    rhs = [rng.choice(symbols) for _ in range(rng.randint(0, 3))] or ['ε']
+    return "add", lhs, rhs
+
+
+def benchmark_edits(repeat: int = 20, rounds: int = 5) -> Tuple[Dict[Tuple[str, str], float], float]:
+    """比较 BENCHMARK_EDITS 中各修改与完整构建内置文法的耗时（秒）
+
+    每个修改在同一编辑器上反复添加再删除，取单次修改的平均耗时；各项均取 rounds 轮中最快的一轮以减少干扰。
+    """
+    def fastest(run) -> float:
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def fresh_build():
+        for _ in range(repeat):
+            SLRParser(Grammar(), "P'", report_conflicts=False)
+
+    timings = {}
+    for lhs, rhs in BENCHMARK_EDITS:
+        editor = GrammarEditor(SLRParser(Grammar(), "P'", report_conflicts=False))
+
+        def edit():
+            for _ in range(repeat):
+                editor.add_production(lhs, rhs)
+                editor.remove_production(lhs, rhs)
+
+        timings[(lhs, " ".join(rhs))] = fastest(edit) / (2 * repeat)
+    return timings, fastest(fresh_build) / repeat
+
+
+def check_timing() -> int:
+    """计时检查：每个修改都应快于完整构建，平均至少快 MIN_SPEEDUP 倍"""
+    timings, fresh = benchmark_edits()
+    print(f"完整构建 {fresh * 1000:.3f} ms")
+    for (lhs, rhs), elapsed in timings.items():
+        print(f"  {lhs} -> {rhs:24} {elapsed * 1000:.3f} ms  ({fresh / elapsed:.1f}x)")
+    average = sum(timings.values()) / len(timings)
+    print(f"平均每次修改 {average * 1000:.3f} ms，比完整构建快 {fresh / average:.1f} 倍")
+    if max(timings.values()) >= fresh or fresh / average < MIN_SPEEDUP:
+        print(f"增量修改没有明显快于完整构建（要求每次都更快、平均至少快 {MIN_SPEEDUP} 倍）")
+        return 1
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    """命令行入口：对内置文法做随机增删，逐次与完整构建比较；参数为 修改次数 随机种子，`--bench` 做计时检查"""
+    if argv and argv[0] == "--bench":
+        return check_timing()
+    edits = int(argv[0]) if argv else 200
+    seed = int(argv[1]) if len(argv) > 1 else 0
+    rng = random.Random(seed)
+    parser = SLRParser(Grammar(), "P'", report_conflicts=False)
+    editor = GrammarEditor(parser)
+
+    applied = 0
+    rebuilt = 0
+    total = 0
+    while applied < edits:
+        kind, lhs, rhs = random_edit(editor, rng)
+        try:
+            if kind == "add":
+                report = editor.add_production(lhs, rhs)
+            else:
+                report = editor.remove_production(lhs, rhs)
+        except ValueError:
+            continue
+        applied += 1
+        rebuilt += report.rebuilt_rows
+        total += len(parser.states)
+        differences = verify_against_fresh_build(parser)
+        if differences:
+            print(f"第 {applied} 次修改（{kind} {lhs} -> {' '.join(rhs)}）后与完整构建不一致：")
+            for difference in differences:
+                print(f"  {difference}")
+            return 1
+
+    print(f"{applied} 次随机修改后均与完整构建一致，共重建 {rebuilt}/{total} 行")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
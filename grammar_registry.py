@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from SLR_parser import Grammar, ParseContext, SLRParser, SLRParserEngine
+
+
+def tokenize_compact_body(body: str) -> List[str]:
+    """拆分紧凑格式的右部（如 `Td(N){CQ}`）
+
+    大写字母（可带 `'`）为非终结符，连续两个以上的小写字母为关键字，
+    其余字符各自作为一个终结符，空白仅用于分隔。
+    """
+    symbols = []
+    pos = 0
+    while pos < len(body):
+        ch = body[pos]
+        if ch.isspace():
+            pos += 1
+        elif 'A' <= ch <= 'Z':
+            end = pos + 1
+            while end < len(body) and body[end] == "'":
+                end += 1
+            symbols.append(body[pos:end])
+            pos = end
+        elif 'a' <= ch <= 'z':
+            end = pos + 1
+            while end < len(body) and 'a' <= body[end] <= 'z':
+                end += 1
+            word = body[pos:end]
+            if len(word) > 1:
+                symbols.append(word)
+            else:
+                symbols.append(ch)
+            pos = end
+        else:
+            symbols.append(ch)
+            pos += 1
+    return symbols or ['ε']
+
+
+def load_grammar_rules(grammar_str: str) -> List[Tuple[str, List[str]]]:
+    """将文法文本解析为产生式列表
+
+    支持 `sentences.txt` 的紧凑格式（`P->CQ`）和 `table_of_SLR.py` 中以空格分隔的格式
+    （`P -> C Q`）。若第一条产生式不是扩展开始产生式，自动添加 `S' -> S`。
+    """
+    rules = []
+    for line in grammar_str.strip().splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        head, bodies = line.split("->", 1)
+        head = head.strip()
+        spaced = " -> " in line
+        for body in bodies.split("|"):
+            body = body.strip()
+            if spaced:
+                symbols = body.split() if body != "ε" else ["ε"]
+            else:
+                symbols = tokenize_compact_body(body)
+            rules.append((head, symbols))
+
+    if not rules:
+        raise ValueError("文法为空")
+    start = rules[0][0]
+    if not start.endswith("'"):
+        rules.insert(0, (start + "'", [start]))
+    return rules
+
+
+def undefined_nonterminals(grammar_rules: List[Tuple[str, List[str]]]) -> List[str]:
+    """返回右部中出现、但没有任何产生式的非终结符（按两种文法格式的约定，以大写字母开头的符号）"""
+    defined = {lhs for lhs, _ in grammar_rules}
+    return sorted({symbol for _, rhs in grammar_rules for symbol in rhs
+                   if 'A' <= symbol[:1] <= 'Z' and symbol not in defined})
+
+
+class GrammarRegistry:
+    """进程内多文法注册表
+
+    按名称登记文法，首次使用时编译为 SLRParser，并以文法指纹为键放入容量有限的 LRU 缓存。
+    编译后的解析器及其分析引擎在构建完成后只读，可被多个请求共享；每次分析使用新的 ParseContext。
+    """
+
+    def __init__(self, max_parsers: int = 8):
+        if max_parsers < 1:
+            raise ValueError("max_parsers 必须为正数")
+        self.max_parsers = max_parsers
+        self.grammars = {}  # 名称 -> 产生式列表（None 表示内置文法）
+        self.fingerprints = {}  # 名称 -> 文法指纹
+        self.engines = OrderedDict()  # 文法指纹 -> SLRParserEngine（含已编译的解析器），按最近使用排序
+        self.lock = threading.Lock()
+
+    def register(self, name: str, grammar_rules: Optional[List[Tuple[str, List[str]]]] = None) -> str:
+        """登记文法（未指定产生式时为内置文法），返回文法指纹
+
+        右部使用了未定义的非终结符时抛出 ValueError，否则这些符号会被当作终结符，文法无法接受正常的输入。
+        """
+        if grammar_rules is not None:
+            undefined = undefined_nonterminals(grammar_rules)
+            if undefined:
+                raise ValueError(f"文法 {name} 使用了未定义的非终结符：{', '.join(undefined)}")
+        fingerprint = Grammar(grammar_rules).fingerprint()
+        with self.lock:
+            self.grammars[name] = grammar_rules
+            self.fingerprints[name] = fingerprint
+        return fingerprint
+
+    def register_text(self, name: str, grammar_str: str) -> str:
+        """从文法文本登记文法"""
+        return self.register(name, load_grammar_rules(grammar_str))
+
+    def register_file(self, name: str, path: str) -> str:
+        """从 `sentences.txt` 格式的文件登记文法"""
+        with open(path, "r", encoding="utf-8") as f:
+            return self.register_text(name, f.read())
+
+    def names(self) -> List[str]:
+        with self.lock:
+            return list(self.grammars)
+
+    def get_parser(self, name: str) -> SLRParser:
+        """获取已编译的解析器"""
+        return self.engine(name).parser
+
+    def engine(self, name: str) -> SLRParserEngine:
+        """获取共享已编译解析器的分析引擎，缓存未命中时编译，超出容量时淘汰最久未用的文法
+
+        引擎不保存分析状态，可通过 run 并发使用（兼容接口 parse 会修改引擎属性，不应在此使用）。
+        """
+        with self.lock:
+            if name not in self.grammars:
+                raise KeyError(f"未登记的文法：{name}")
+            fingerprint = self.fingerprints[name]
+            engine = self.engines.get(fingerprint)
+            if engine is not None:
+                self.engines.move_to_end(fingerprint)
+                return engine
+            grammar_rules = self.grammars[name]
+
+        # 编译可能较慢，不持有锁；并发编译同一文法时保留先完成的结果
+        # 服务中编译时不打印冲突，需要时通过 parser.conflicts 查看
+        grammar = Grammar(grammar_rules)
+        engine = SLRParserEngine(SLRParser(grammar, grammar.productions_list[0][0], report_conflicts=False))
+        engine.debug = False
+
+        with self.lock:
+            existing = self.engines.get(fingerprint)
+            if existing is not None:
+                self.engines.move_to_end(fingerprint)
+                return existing
+            self.engines[fingerprint] = engine
+            while len(self.engines) > self.max_parsers:
+                self.engines.popitem(last=False)
+        return engine
+
+    def parse(self, name: str, tokens: List[Tuple[str, str, int]]) -> ParseContext:
+        """用指定文法分析token序列，返回包含中间代码和错误信息的分析上下文"""
+        return self.engine(name).run(tokens)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"grammars": len(self.grammars), "compiled": len(self.engines)}
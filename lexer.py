@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import string
+import sys
+from typing import List, Optional, Tuple
+
+from SLR_parser import ParseContext, SLRParserEngine
+
+KEYWORDS = {'int', 'void', 'if', 'else', 'while', 'return'}
+
+LETTERS = string.ascii_letters + "_"
+DIGITS = string.digits
+WHITESPACE = " \t\r\n"
+
+# 词法规则：(token类型, 备选序列列表)，序列元素为 (字符集, 量词)，量词为 '1'、'?' 或 '*'
+# 列表顺序即优先级；类型为 None 的规则匹配后丢弃。关键字先按 ID 识别再查表区分。
+TOKEN_RULES = [
+    (None, [[(WHITESPACE, '1'), (WHITESPACE, '*')]]),
+    ("ID", [[(LETTERS, '1'), (LETTERS + DIGITS, '*')]]),
+    ("NUMBER", [[(DIGITS, '1'), (DIGITS, '*')]]),
+    ("REL", [[("<>", '1'), ("=", '?')], [("=", '1'), ("=", '1')], [("!", '1'), ("=", '1')]]),
+    ("ASG", [[("=", '1')]]),
+    ("LPA", [[("(", '1')]]),
+    ("RPA", [[(")", '1')]]),
+    ("LBR", [[("[", '1')]]),
+    ("RBR", [[("]", '1')]]),
+    ("LCU", [[("{", '1')]]),
+    ("RCU", [[("}", '1')]]),
+    ("SCO", [[(";", '1')]]),
+    ("ADD", [[("+", '1')]]),
+    ("MUL", [[("*", '1')]]),
+    ("COM", [[(",", '1')]]),
+    ("AND", [[("∧", '1')], [("&", '1'), ("&", '1')]]),
+    ("OR", [[("∨", '1')], [("|", '1'), ("|", '1')]]),
+    ("QST", [[("?", '1')]]),
+    ("COL", [[(":", '1')]]),
+]
+
+
+class DFALexer:
+    """表驱动的DFA词法分析器
+
+    构建时将 TOKEN_RULES 转换为 NFA，经子集构造得到 DFA 并最小化，
+    转移表按 状态 * 字符类数 + 字符类 平铺存放；扫描时一次遍历源码缓冲区，按最长匹配输出token。
+    """
+
+    def __init__(self, rules=None):
+        self.rules = rules if rules is not None else TOKEN_RULES
+        self.ascii_classes = [0] * 128  # ASCII 字符 -> 字符类，0 为“其他”
+        self.extra_classes = {}  # 非 ASCII 字符 -> 字符类
+        self.class_count = 1
+        self.table = []  # 平铺的转移表，-1 表示无转移
+        self.accepts = []  # 状态 -> 规则下标，非接受状态为 -1
+        self.build()
+
+    # ---------- DFA 构建 ----------
+
+    def build_char_classes(self):
+        """按字符所属字符集的组合划分等价字符类"""
+        charsets = [chars for _, alternatives in self.rules for seq in alternatives for chars, _ in seq]
+        signatures = {}
+        all_chars = sorted(set("".join(charsets)))
+        for ch in all_chars:
+            signature = tuple(ch in chars for chars in charsets)
+            if signature not in signatures:
+                signatures[signature] = len(signatures) + 1
+            cls = signatures[signature]
+            if ord(ch) < 128:
+                self.ascii_classes[ord(ch)] = cls
+            else:
+                self.extra_classes[ch] = cls
+        self.class_count = len(signatures) + 1
+
+    def char_class(self, ch: str) -> int:
+        code = ord(ch)
+        if code < 128:
+            return self.ascii_classes[code]
+        return self.extra_classes.get(ch, 0)
+
+    def build_nfa(self):
+        """构建NFA，返回 (转移表, ε转移表, 接受状态 -> 规则下标)"""
+        edges = [[]]  # 状态 -> [(字符类集合, 目标状态)]
+        epsilon = [[]]  # 状态 -> [目标状态]
+        accepting = {}
+
+        def new_state():
+            edges.append([])
+            epsilon.append([])
+            return len(edges) - 1
+
+        for rule_idx, (_, alternatives) in enumerate(self.rules):
+            for seq in alternatives:
+                current = new_state()
+                epsilon[0].append(current)
+                for chars, quantifier in seq:
+                    classes = frozenset(self.char_class(ch) for ch in chars)
+                    target = new_state()
+                    if quantifier == '1':
+                        edges[current].append((classes, target))
+                    elif quantifier == '?':
+                        edges[current].append((classes, target))
+                        epsilon[current].append(target)
+                    elif quantifier == '*':
+                        epsilon[current].append(target)
+                        edges[target].append((classes, target))
+                    else:
+                        raise ValueError(f"未知的量词：{quantifier}")
+                    current = target
+                accepting[current] = rule_idx
+
+        return edges, epsilon, accepting
+
+    @staticmethod
+    def epsilon_closure(states, epsilon):
+        closure = set(states)
+        stack = list(states)
+        while stack:
+            state = stack.pop()
+            for target in epsilon[state]:
+                if target not in closure:
+                    closure.add(target)
+                    stack.append(target)
+        return frozenset(closure)
+
+    def build(self):
+        """子集构造 + Moore 最小化，生成平铺转移表"""
+        self.build_char_classes()
+        edges, epsilon, accepting = self.build_nfa()
+        class_count = self.class_count
+
+        start = self.epsilon_closure([0], epsilon)
+        dfa_states = {start: 0}
+        dfa_list = [start]
+        transitions = []
+        accepts = []
+        index = 0
+        while index < len(dfa_list):
+            nfa_states = dfa_list[index]
+            row = [-1] * class_count
+            for cls in range(1, class_count):
+                moved = {target for state in nfa_states for classes, target in edges[state] if cls in classes}
+                if not moved:
+                    continue
+                target_set = self.epsilon_closure(moved, epsilon)
+                if target_set not in dfa_states:
+                    dfa_states[target_set] = len(dfa_list)
+                    dfa_list.append(target_set)
+                row[cls] = dfa_states[target_set]
+            transitions.append(row)
+            rules = [accepting[state] for state in nfa_states if state in accepting]
+            accepts.append(min(rules) if rules else -1)
+            index += 1
+
+        # Moore 最小化：先按接受的规则划分，再按转移目标所在的块反复细分
+        blocks = [accepts[state] for state in range(len(dfa_list))]
+        while True:
+            signatures = {}
+            new_blocks = []
+            for state in range(len(dfa_list)):
+                signature = (blocks[state],) + tuple(
+                    blocks[target] if target >= 0 else None for target in transitions[state])
+                new_blocks.append(signatures.setdefault(signature, len(signatures)))
+            if len(signatures) == len(set(blocks)):
+                blocks = new_blocks
+                break
+            blocks = new_blocks
+
+        # 重新编号，保证开始状态为 0
+        order = {blocks[0]: 0}
+        for state in range(len(dfa_list)):
+            order.setdefault(blocks[state], len(order))
+        self.table = [-1] * (len(order) * class_count)
+        self.accepts = [-1] * len(order)
+        for state in range(len(dfa_list)):
+            new_state = order[blocks[state]]
+            self.accepts[new_state] = accepts[state]
+            for cls, target in enumerate(transitions[state]):
+                if target >= 0:
+                    self.table[new_state * class_count + cls] = order[blocks[target]]
+
+    @property
+    def state_count(self) -> int:
+        return len(self.accepts)
+
+    # ---------- 扫描 ----------
+
+    def tokenize(self, text: str, source_name: str = "<source>") -> Tuple[List[Tuple[str, str, int, int]], List[str]]:
+        """扫描源码，返回 ((类型, 值, 行, 列) 列表, 错误信息)，末尾附加 `$`"""
+        table = self.table
+        accepts = self.accepts
+        class_count = self.class_count
+        ascii_classes = self.ascii_classes
+        extra_classes = self.extra_classes
+        token_types = [token_type for token_type, _ in self.rules]
+        intern = sys.intern
+
+        tokens = []
+        errors = []
+        length = len(text)
+        pos = 0
+        line = 1
+        line_start = 0
+
+        while pos < length:
+            state = 0
+            last_rule = -1
+            last_end = pos
+            i = pos
+            while i < length:
+                code = ord(text[i])
+                cls = ascii_classes[code] if code < 128 else extra_classes.get(text[i], 0)
+                state = table[state * class_count + cls]
+                if state < 0:
+                    break
+                i += 1
+                if accepts[state] >= 0:
+                    last_rule = accepts[state]
+                    last_end = i
+
+            if last_rule < 0:
+                errors.append(f"{source_name}:{line}:{pos - line_start + 1}: 错误：无法识别的字符 '{text[pos]}'")
+                if text[pos] == "\n":
+                    line += 1
+                    line_start = pos + 1
+                pos += 1
+                continue
+
+            token_type = token_types[last_rule]
+            if token_type is None:
+                newlines = text.count("\n", pos, last_end)
+                if newlines:
+                    line += newlines
+                    line_start = text.rindex("\n", pos, last_end) + 1
+            else:
+                value = intern(text[pos:last_end])
+                if token_type == "ID" and value in KEYWORDS:
+                    token_type = "KEY"
+                tokens.append((token_type, value, line, pos - line_start + 1))
+            pos = last_end
+
+        tokens.append(("$", "$", line, pos - line_start + 1))
+        return tokens, errors
+
+
+_default_lexer: Optional[DFALexer] = None
+
+
+def default_lexer() -> DFALexer:
+    """返回共享的默认词法分析器（转移表只构建一次）"""
+    global _default_lexer
+    if _default_lexer is None:
+        _default_lexer = DFALexer()
+    return _default_lexer
+
+
+_default_engine: Optional[SLRParserEngine] = None
+
+
+def default_engine() -> SLRParserEngine:
+    """返回共享的默认分析引擎（分析表只构建一次，可并发使用）"""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = SLRParserEngine()
+        _default_engine.debug = False
+    return _default_engine
+
+
+def parse_source(text: str, source_name: str = "<source>",
+                 engine: Optional[SLRParserEngine] = None) -> Tuple[bool, ParseContext]:
+    """词法分析后直接送入语法分析引擎，不经过中间token文件，返回 (是否成功, 分析上下文)"""
+    if engine is None:
+        engine = default_engine()
+    context = engine.new_context(source_name=source_name)
+    tokens, errors = default_lexer().tokenize(text, source_name)
+    if errors:
+        context.errors.extend(errors)
+        return False, context
+    engine.run(tokens, context)
+    return context.success, context
+
+
+def main(argv: List[str]) -> int:
+    """命令行入口：直接分析源文件并输出中间代码"""
+    path = argv[0] if argv else "13.src"
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    success, context = parse_source(text, path)
+    if success:
+        print("=== 中间代码（四元式） ===")
+        for i, quad in enumerate(context.intermediate_code, 1):
+            print(f"{i:2d}: {quad}")
+        return 0
+
+    print("语义检查失败！" if context.accepted else "语法分析失败！")
+    for error in context.errors:
+        print(error)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from SLR_parser import Grammar, ParseContext, SLRParser, SLRParserEngine, TokenMapper
+from symbol_table import SymbolTable
+
+TEMP_MARK = "\x00t"  # 分块分析时临时变量的前缀，拼接时重新编号
+LABEL_MARK = "\x00L"  # 分块分析时标签的前缀，拼接时重新编号
+
+OPENERS = {'(', '[', '{'}
+CLOSERS = {')', ']', '}'}
+
+
+def split_top_level(tokens: List[Tuple]) -> Tuple[List[Tuple[int, int]], int, List[Tuple]]:
+    """预扫描：按括号平衡的顶层 `;` 切分出顶层声明
+
+    返回 (各声明的 [起, 止) 区间, 语句部分的起始下标, 各声明登记的全局符号)。
+    全局符号为 (名字, 类型, 种类, token)，与符号表在分析时登记的内容一致。
+    """
+    token_map = TokenMapper.TOKEN_MAP
+    symbols = [token_map.get(token[0], token[1]) for token in tokens]
+    chunks = []
+    globals_ = []
+    start = 0
+    length = len(tokens)
+
+    while start < length and symbols[start] in ('int', 'void'):
+        depth = 0
+        end = -1
+        for i in range(start, length):
+            symbol = symbols[i]
+            if symbol in OPENERS:
+                depth += 1
+            elif symbol in CLOSERS:
+                depth -= 1
+            elif symbol == ';' and depth == 0:
+                end = i + 1
+                break
+            elif symbol == '$':
+                break
+        if end < 0 or end - start < 3 or symbols[start + 1] != 'd':
+            break
+
+        third = symbols[start + 2]
+        kind = "func" if third == '(' else "array" if third == '[' else "var"
+        globals_.append((tokens[start + 1][1], tokens[start][1], kind, tokens[start + 1]))
+        chunks.append((start, end))
+        start = end
+
+    return chunks, start, globals_
+
+
+_worker_engine: Optional[SLRParserEngine] = None
+
+
+def init_worker(grammar_rules, follow_extra, precedence):
+    """进程池初始化：每个工作进程构建一次惰性分析表（冲突已由主进程报告，工作进程不再打印）"""
+    global _worker_engine
+    grammar = Grammar(grammar_rules)
+    grammar.follow_extra = follow_extra
+    grammar.precedence = precedence
+    _worker_engine = SLRParserEngine(SLRParser(grammar, grammar_rules[0][0], lazy=True, report_conflicts=False))
+    _worker_engine.debug = False
+
+
+def parse_batch(job):
+    """在工作进程中依次分析一批相邻的块
+
+    同一批的块共用一张符号表：先登记本批之前的全局符号，各块分析时再登记自己的声明，
+    与顺序分析时符号表的变化完全一致。
+    """
+    engine = _worker_engine
+    first_batch, chunk_tokens, seed, has_final, options = job
+    parser = engine.parser
+    state_c = parser.goto_table[0]['C']
+
+    symbols = SymbolTable()
+    for name, type_, kind, token in seed:
+        symbols.declare(name, type_, kind, token)
+
+    results = []
+    for index, tokens in enumerate(chunk_tokens):
+        context = engine.new_context(temp_prefix=TEMP_MARK, label_prefix=LABEL_MARK,
+                                     debug=False, build_tree=False, **options)
+        context.symbols = symbols
+        final = has_final and index == len(chunk_tokens) - 1
+        if first_batch and index == 0:
+            start_states, start_symbols = None, None
+        else:
+            start_states, start_symbols = [0, state_c], ['C']
+        stop_states = None if final else [0, state_c]
+
+        ok = engine.parse_with_context(tokens, context, start_states, start_symbols, stop_states)
+        results.append((ok, context.intermediate_code, context.errors,
+                        context.temp_count, context.label_count, symbols if final else None))
+        if not ok:
+            break
+    return results
+
+
+class ParallelParser:
+    """把一个大文件的顶层声明分块，在进程池中并行分析后拼接结果
+
+    预扫描按括号平衡的顶层 `;` 切分出 `C -> C D ;` 中的各个声明，最后的语句部分 `Q` 作为一块；
+    每块从对应的 LR 状态（状态栈 [0, GOTO(0, C)]）开始分析，拼接时按块的顺序重新编号临时变量和标签。
+    结果与顺序分析完全相同；任何一块出错时退回顺序分析，以得到完全一致的错误信息。
+    """
+
+    def __init__(self, engine: Optional[SLRParserEngine] = None, max_workers: Optional[int] = None,
+                 min_chunks: int = 8):
+        if engine is None:
+            engine = SLRParserEngine()
+            engine.debug = False
+        self.engine = engine
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_chunks = min_chunks  # 声明数少于该值（或只有一个工作进程）时直接顺序分析
+        self.executor = None
+        # 只有包含 P -> C Q 与 C -> C D ; 的文法才能按顶层声明切分
+        self.splittable = {1, 3} <= set(engine.semantic_ids)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            grammar = self.engine.grammar
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=init_worker,
+                initargs=(grammar.productions_list, grammar.follow_extra, grammar.precedence))
+        return self.executor
+
+    def parse(self, tokens: List[Tuple], **options) -> ParseContext:
+        """分析token序列，返回与 SLRParserEngine.run 相同的上下文"""
+        engine = self.engine
+        options.setdefault("debug", False)
+        context = engine.new_context(**options)
+
+        chunks, rest, globals_ = split_top_level(tokens) if self.splittable else ([], 0, [])
+        if (self.max_workers < 2 or len(chunks) < self.min_chunks
+                or context.debug or context.build_tree):
+            return engine.run(tokens, context)
+
+        # 每个声明块附带下一个token作为向前看符号；语句部分（含 `$`）作为最后一块
+        pieces = [tokens[start:end + 1] for start, end in chunks]
+        pieces.append(tokens[rest:])
+
+        chunk_options = {
+            "source_name": context.source_name,
+            "check_semantics": context.check_semantics,
+            "value_numbering": context.value_numbering,
+        }
+        batch_count = min(len(pieces), self.max_workers * 4)
+        batch_size = -(-len(pieces) // batch_count)
+        jobs = []
+        for batch_start in range(0, len(pieces), batch_size):
+            batch = pieces[batch_start:batch_start + batch_size]
+            has_final = batch_start + len(batch) == len(pieces)
+            jobs.append((batch_start == 0, batch, globals_[:batch_start], has_final, chunk_options))
+
+        results = []
+        for batch_results in self.get_executor().map(parse_batch, jobs):
+            results.extend(batch_results)
+
+        if len(results) != len(pieces) or not all(result[0] for result in results):
+            return engine.run(tokens, engine.new_context(**options))
+
+        return self.stitch(results, context)
+
+    @staticmethod
+    def stitch(results, context: ParseContext) -> ParseContext:
+        """按块的顺序拼接四元式，并把各块的临时变量和标签换成全局编号"""
+        temp_base = 0
+        label_base = 0
+        code = context.intermediate_code
+        mark_len = len(TEMP_MARK)
+
+        for ok, quads, errors, temp_count, label_count, symbols in results:
+            for quad in quads:
+                renamed = []
+                for operand in quad:
+                    if isinstance(operand, str) and operand.startswith("\x00"):
+                        number = int(operand[mark_len:])
+                        if operand.startswith(TEMP_MARK):
+                            operand = f"{context.temp_prefix}{temp_base + number}"
+                        else:
+                            operand = f"{context.label_prefix}{label_base + number}"
+                    renamed.append(operand)
+                code.append(tuple(renamed))
+            context.errors.extend(errors)
+            temp_base += temp_count
+            label_base += label_count
+            if symbols is not None:
+                context.symbols = symbols
+
+        context.temp_count = temp_base
+        context.label_count = label_base
+        context.accepted = True
+        context.success = True
+        return context
+
+
+def parse_parallel(tokens: List[Tuple], engine: Optional[SLRParserEngine] = None,
+                   max_workers: Optional[int] = None, **options) -> ParseContext:
+    """一次性并行分析（会创建并关闭进程池；多次调用请复用 ParallelParser）"""
+    with ParallelParser(engine, max_workers) as parallel:
+        return parallel.parse(tokens, **options)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import zlib
+from typing import List, Optional, Tuple
+
+from SLR_parser import ParseContext, SLRParserEngine, private_cache_dir, split_token_lines
+from symbol_table import Symbol, SymbolOperand
+
+CACHE_VERSION = 2  # 存储格式版本，参与缓存键的计算
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+EVICT_RATIO = 0.8  # 超出上限时淘汰到上限的这一比例以下，避免每次写入都扫描目录
+
+
+def encode_quads(quads: List[Tuple]) -> Tuple[list, list]:
+    """把四元式编码为只含内置类型的形式
+
+    SymbolOperand 替换为符号列表中的下标，符号存为 (名字, 类型, 种类, 槽位, 作用域深度)；
+    其余操作数（字符串或 None）原样保存。
+    """
+    symbols = []
+    indexes = {}
+    encoded = []
+    for quad in quads:
+        row = []
+        for operand in quad:
+            if isinstance(operand, SymbolOperand):
+                symbol = operand.symbol
+                index = indexes.get(id(symbol))
+                if index is None:
+                    index = indexes[id(symbol)] = len(symbols)
+                    symbols.append((str(operand), symbol.type, symbol.kind, symbol.slot, symbol.depth))
+                operand = index
+            row.append(operand)
+        encoded.append(tuple(row))
+    return encoded, symbols
+
+
+def decode_quads(encoded: list, symbols: list) -> List[Tuple]:
+    operands = [SymbolOperand(name, Symbol(name, type_, kind, slot, depth))
+                for name, type_, kind, slot, depth in symbols]
+    return [tuple(operands[operand] if type(operand) is int else operand for operand in quad) for quad in encoded]
+
+
+class ParseCache:
+    """以内容寻址的分析结果缓存
+
+    键为 (token序列, 文法指纹, 分析选项) 的 SHA-256，值为分析结果、四元式、计数器和错误信息，
+    以 marshal + zlib 压缩后存放在 directory 下按键前两位分桶的文件中。
+    写入先写临时文件再原子替换，命中时更新文件的修改时间，总大小超过 max_bytes 时按修改时间淘汰最旧的条目，
+    因此同一用户的多个进程可以共享同一目录（默认 `~/.cache/slr/parse`，见 private_cache_dir）。
+    符号表和语法树不缓存，命中时上下文中的符号表为空。
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        # 条目会被 marshal 反序列化并当作分析结果使用，目录必须只有当前用户可写
+        self.directory = private_cache_dir("parse", directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.size = None  # 估计的目录总大小，首次写入时扫描得到
+        self.lock = threading.Lock()
+
+    # ---------- 缓存键 ----------
+
+    @staticmethod
+    def key(tokens: List[Tuple], engine: SLRParserEngine, context: ParseContext) -> str:
+        digest = hashlib.sha256()
+        options = (CACHE_VERSION, engine.grammar.fingerprint(), context.source_name, context.check_semantics,
+                   context.value_numbering, context.temp_prefix, context.label_prefix)
+        digest.update(repr(options).encode("utf-8"))
+        # marshal 格式 0 不记录字符串是否驻留及对象引用，相同内容的token序列得到相同字节
+        digest.update(marshal.dumps(tokens, 0))
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    # ---------- 读写 ----------
+
+    def load(self, key: str, context: ParseContext) -> bool:
+        """读取缓存条目并填入 context，未命中或条目损坏时返回 False"""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            success, accepted, temp_count, label_count, quads, symbols, errors = marshal.loads(zlib.decompress(data))
+            quads = decode_quads(quads, symbols)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, EOFError, TypeError, IndexError, zlib.error):
+            self.discard(path)
+            return False
+
+        context.intermediate_code.extend(quads)
+        context.temp_count = temp_count
+        context.label_count = label_count
+        context.errors.extend(errors)
+        context.accepted = accepted
+        context.success = success
+        try:
+            os.utime(path)  # 记录最近使用时间，供淘汰使用
+        except OSError:
+            pass
+        return True
+
+    def store(self, key: str, context: ParseContext):
+        """原子地写入一个缓存条目"""
+        quads, symbols = encode_quads(context.intermediate_code)
+        data = zlib.compress(marshal.dumps((context.success, context.accepted, context.temp_count,
+                                            context.label_count, quads, symbols, list(context.errors))))
+        path = self.path(key)
+        bucket = os.path.dirname(path)
+        os.makedirs(bucket, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=bucket, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self.discard(tmp_path)
+            raise
+
+        with self.lock:
+            if self.size is None:
+                self.size = self.scan_size()
+            else:
+                self.size += len(data)
+            if self.size > self.max_bytes:
+                self.evict()
+
+    @staticmethod
+    def discard(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    # ---------- 淘汰 ----------
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """列出全部条目的 (修改时间, 大小, 路径)"""
+        entries = []
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def scan_size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """按最近使用时间从旧到新删除条目，直到总大小低于上限的 EVICT_RATIO"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICT_RATIO
+        for _, size, path in entries:
+            if total <= target:
+                break
+            self.discard(path)
+            total -= size
+        self.size = total
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self.discard(path)
+        self.size = 0
+
+    # ---------- 分析入口 ----------
+
+    def run(self, engine: SLRParserEngine, tokens: List[Tuple], context: Optional[ParseContext] = None) -> ParseContext:
+        """与 SLRParserEngine.run 相同；结果已缓存时直接读取，否则分析后写入缓存
+
+        开启 debug 或 build_tree 时不使用缓存。
+        """
+        if context is None:
+            context = engine.new_context()
+        if context.debug or context.build_tree:
+            return engine.run(tokens, context)
+
+        key = self.key(tokens, engine, context)
+        error_count = len(context.errors)
+        if not context.intermediate_code and not error_count and self.load(key, context):
+            self.hits += 1
+            return context
+
+        self.misses += 1
+        engine.run(tokens, context)
+        if error_count == 0:
+            self.store(key, context)
+        return context
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "directory": self.directory, "max_bytes": self.max_bytes}
+
+
+def main(argv: List[str]) -> int:
+    """命令行入口：带缓存地分析给定的token文件，输出错误和命中情况"""
+    paths = argv or ["output.txt"]
+    engine = SLRParserEngine()
+    engine.debug = False
+    cache = ParseCache()
+
+    failed = 0
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                tokens, errors = split_token_lines(f.readlines(), path)
+        except OSError as e:
+            print(f"{path}: 错误：无法读取文件：{e}")
+            failed += 1
+            continue
+        context = cache.run(engine, tokens, engine.new_context(source_name=path))
+        for error in errors + context.errors:
+            print(error)
+        if errors or not context.success:
+            failed += 1
+
+    stats = cache.stats()
+    print(f"\n{len(paths)} 个文件，缓存命中 {stats['hits']}，未命中 {stats['misses']}（{stats['directory']}）")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
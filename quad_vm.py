@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 指令操作码
+OP_ASSIGN = 0  # frame[d] = frame[a]
+OP_ADD = 1  # frame[d] = frame[a] + frame[b]
+OP_MUL = 2  # frame[d] = frame[a] * frame[b]
+OP_IF = 3  # if frame[a]: pc = d
+OP_GOTO = 4  # pc = d
+OP_RETURN = 5  # 返回 frame[a]（a 为 -1 时返回 None）
+
+OPCODES = {"=": OP_ASSIGN, "+": OP_ADD, "*": OP_MUL, "if": OP_IF, "goto": OP_GOTO, "return": OP_RETURN}
+OP_NAMES = {code: name for name, code in OPCODES.items()}
+
+# 运算符优先级与结合性检查：(表达式, 期望的运算四元式, a=2、b=3、c=5 时的值)
+EXPRESSION_CASES = [
+    ("a * b + c", [("*", "a", "b", "t1"), ("+", "t1", "c", "t2")], 11),
+    ("a + b * c", [("*", "b", "c", "t1"), ("+", "a", "t1", "t2")], 17),
+    ("a + b + c", [("+", "a", "b", "t1"), ("+", "t1", "c", "t2")], 10),
+    ("a * b * c", [("*", "a", "b", "t1"), ("*", "t1", "c", "t2")], 30),
+    ("(a + b) * c", [("+", "a", "b", "t1"), ("*", "t1", "c", "t2")], 25),
+]
+EXPRESSION_INPUTS = {"a": 2, "b": 3, "c": 5}
+
+
+class VMError(Exception):
+    """四元式编译或执行错误"""
+
+
+class QuadProgram:
+    """编译后的四元式程序
+
+    标签在编译时解析为指令偏移，变量、临时变量和常量统一映射到帧数组中的整数槽位，
+    常量槽位在帧模板中预先填好，因此每条指令都是 (操作码, a, b, d) 四个整数。
+    """
+
+    def __init__(self, code: List[Tuple[int, int, int, int]], slot_names: List[str], frame_template: List[int]):
+        self.code = code
+        self.slot_names = slot_names  # 槽位 -> 名称（常量槽位为其字面值）
+        self.frame_template = frame_template
+        self.slots = {name: slot for slot, name in enumerate(slot_names)}
+
+    def __len__(self):
+        return len(self.code)
+
+    def disassemble(self) -> List[str]:
+        """以可读形式列出指令"""
+        lines = []
+        for pc, (op, a, b, d) in enumerate(self.code):
+            names = [self.slot_names[x] if x >= 0 else "_" for x in (a, b)]
+            target = str(d) if op in (OP_IF, OP_GOTO) else (self.slot_names[d] if d >= 0 else "_")
+            lines.append(f"{pc:4d}: {OP_NAMES[op]:6} {names[0]:>8} {names[1]:>8} -> {target}")
+        return lines
+
+
+def is_literal(operand: str) -> bool:
+    return operand.lstrip("-").isdigit()
+
+
+def compile_quads(quads: List[Tuple]) -> QuadProgram:
+    """将 SLRParserEngine 生成的四元式编译为 QuadProgram"""
+    # 第一遍：解析标签偏移
+    labels = {}
+    offset = 0
+    for quad in quads:
+        if quad[0] == "label":
+            if quad[1] in labels:
+                raise VMError(f"重复的标签：{quad[1]}")
+            labels[quad[1]] = offset
+        elif quad[0] in OPCODES:
+            offset += 1
+        else:
+            raise VMError(f"未知的四元式操作：{quad[0]}")
+
+    slot_names = []
+    frame_template = []
+    slots = {}
+
+    def slot_of(operand) -> int:
+        if operand is None:
+            return -1
+        operand = str(operand)
+        slot = slots.get(operand)
+        if slot is None:
+            slot = len(slot_names)
+            slots[operand] = slot
+            slot_names.append(operand)
+            frame_template.append(int(operand) if is_literal(operand) else 0)
+        return slot
+
+    # 第二遍：生成指令
+    code = []
+    for op_name, arg1, arg2, result in quads:
+        if op_name == "label":
+            continue
+        op = OPCODES[op_name]
+        if op in (OP_IF, OP_GOTO):
+            if result not in labels:
+                raise VMError(f"未定义的标签：{result}")
+            code.append((op, slot_of(arg1), -1, labels[result]))
+        elif op == OP_RETURN:
+            code.append((op, slot_of(arg1), -1, -1))
+        else:
+            code.append((op, slot_of(arg1), slot_of(arg2), slot_of(result)))
+
+    return QuadProgram(code, slot_names, frame_template)
+
+
+class VMProfile:
+    """执行统计：总指令数、各操作码和各指令的执行次数、耗时"""
+
+    def __init__(self, program: QuadProgram):
+        self.program = program
+        self.steps = 0
+        self.elapsed = 0.0
+        self.instruction_counts = [0] * len(program.code)
+
+    def op_counts(self) -> Dict[str, int]:
+        counts = {}
+        for pc, count in enumerate(self.instruction_counts):
+            if count:
+                name = OP_NAMES[self.program.code[pc][0]]
+                counts[name] = counts.get(name, 0) + count
+        return counts
+
+    def report(self) -> str:
+        lines = [f"执行指令数：{self.steps}，耗时：{self.elapsed * 1000:.3f} ms"]
+        if self.elapsed > 0:
+            lines.append(f"吞吐量：{self.steps / self.elapsed:,.0f} 条/秒")
+        for name, count in sorted(self.op_counts().items(), key=lambda item: -item[1]):
+            lines.append(f"  {name:6} {count}")
+        return "\n".join(lines)
+
+
+class QuadVM:
+    """寄存器式四元式虚拟机"""
+
+    def __init__(self, program: QuadProgram, max_steps: Optional[int] = None):
+        self.program = program
+        self.max_steps = max_steps  # 执行步数上限，防止死循环；恰好执行完 max_steps 条指令时不报错
+        self.frame = list(program.frame_template)
+        self.profile = None  # 最近一次 run(profile=True) 的统计
+
+    def variables(self) -> Dict[str, int]:
+        """返回最近一次执行后各变量和临时变量的值"""
+        return {name: self.frame[slot] for slot, name in enumerate(self.program.slot_names)
+                if not is_literal(name)}
+
+    def run(self, inputs: Optional[Dict[str, int]] = None, profile: bool = False):
+        """从第一条指令开始执行，返回 return 的值（未执行到 return 时为 None）"""
+        frame = self.frame = list(self.program.frame_template)
+        if inputs:
+            for name, value in inputs.items():
+                slot = self.program.slots.get(name)
+                if slot is not None:
+                    frame[slot] = value
+        if profile:
+            return self.run_profiled(frame)
+
+        code = self.program.code
+        size = len(code)
+        limit = self.max_steps if self.max_steps is not None else -1
+        pc = 0
+        while pc < size:
+            if limit >= 0:
+                if limit == 0:
+                    raise VMError(f"超过执行步数上限 {self.max_steps}")
+                limit -= 1
+            op, a, b, d = code[pc]
+            pc += 1
+            if op == OP_ASSIGN:
+                frame[d] = frame[a]
+            elif op == OP_ADD:
+                frame[d] = frame[a] + frame[b]
+            elif op == OP_MUL:
+                frame[d] = frame[a] * frame[b]
+            elif op == OP_IF:
+                if frame[a]:
+                    pc = d
+            elif op == OP_GOTO:
+                pc = d
+            else:
+                return frame[a] if a >= 0 else None
+        return None
+
+    def run_profiled(self, frame: List[int]):
+        """带统计的执行循环，与 run 语义相同"""
+        stats = self.profile = VMProfile(self.program)
+        counts = stats.instruction_counts
+        code = self.program.code
+        size = len(code)
+        limit = self.max_steps
+        result = None
+        steps = 0
+        pc = 0
+        start = time.perf_counter()
+        while pc < size:
+            if limit is not None and steps >= limit:
+                stats.steps = steps
+                stats.elapsed = time.perf_counter() - start
+                raise VMError(f"超过执行步数上限 {self.max_steps}")
+            op, a, b, d = code[pc]
+            counts[pc] += 1
+            steps += 1
+            pc += 1
+            if op == OP_ASSIGN:
+                frame[d] = frame[a]
+            elif op == OP_ADD:
+                frame[d] = frame[a] + frame[b]
+            elif op == OP_MUL:
+                frame[d] = frame[a] * frame[b]
+            elif op == OP_IF:
+                if frame[a]:
+                    pc = d
+            elif op == OP_GOTO:
+                pc = d
+            else:
+                result = frame[a] if a >= 0 else None
+                break
+        stats.elapsed = time.perf_counter() - start
+        stats.steps = steps
+        return result
+
+
+def run_quads(quads: List[Tuple], inputs: Optional[Dict[str, int]] = None, profile: bool = False):
+    """编译并执行四元式，返回 (返回值, 虚拟机)"""
+    vm = QuadVM(compile_quads(quads))
+    return vm.run(inputs, profile=profile), vm
+
+
+def check_expressions(engine=None) -> List[str]:
+    """分析 EXPRESSION_CASES 中的表达式，检查生成的四元式和执行结果，返回不符合预期的描述（为空表示全部通过）"""
+    from lexer import parse_source
+
+    failures = []
+    for expression, operations, value in EXPRESSION_CASES:
+        source = f"int a; int b; int c; int r; r = {expression}; return r"
+        success, context = parse_source(source, expression, engine)
+        if not success:
+            failures.append(f"{expression}：分析失败 {context.errors}")
+            continue
+        expected = operations + [("=", operations[-1][3], None, "r"), ("return", "r", None, None)]
+        quads = [tuple(None if operand is None else str(operand) for operand in quad)
+                 for quad in context.intermediate_code]
+        if quads != expected:
+            failures.append(f"{expression}：四元式为 {quads}，期望 {expected}")
+            continue
+        result, _ = run_quads(context.intermediate_code, EXPRESSION_INPUTS)
+        if result != value:
+            failures.append(f"{expression}：结果为 {result}，期望 {value}")
+    return failures
+
+
+def main(argv: List[str]) -> int:
+    """命令行入口：分析源文件，执行生成的四元式并输出统计；`--check` 检查运算符优先级"""
+    from lexer import parse_source
+
+    if argv[:1] == ["--check"]:
+        failures = check_expressions()
+        for failure in failures:
+            print(failure)
+        print(f"{len(EXPRESSION_CASES) - len(failures)}/{len(EXPRESSION_CASES)} 个表达式符合预期")
+        return 1 if failures else 0
+
+    path = argv[0] if argv else "13.src"
+    with open(path, "r", encoding="utf-8") as f:
+        success, context = parse_source(f.read(), path)
+    if not success:
+        for error in context.errors:
+            print(error)
+        return 1
+
+    result, vm = run_quads(context.intermediate_code, profile=True)
+    print("=== 指令 ===")
+    for line in vm.program.disassemble():
+        print(line)
+    print(f"\n返回值：{result}")
+    print(f"变量：{vm.variables()}")
+    print("\n=== 执行统计 ===")
+    print(vm.profile.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+from typing import List, Optional, Tuple
+
+
+class Symbol:
+    """符号表条目"""
+
+    __slots__ = ("name", "type", "kind", "slot", "depth", "token")
+
+    def __init__(self, name: str, type_: Optional[str], kind: str, slot: int, depth: int, token: Optional[Tuple] = None):
+        self.name = name
+        self.type = type_  # 声明的类型（int / void），数组形参等未写类型的为 None
+        self.kind = kind  # var / array / func / param / param_array / param_func
+        self.slot = slot  # 在所属函数帧（或全局帧）中的槽位
+        self.depth = depth  # 作用域深度，0 为全局
+        self.token = token  # 声明处的token
+
+    def __repr__(self):
+        return f"Symbol({self.name!r}, type={self.type!r}, kind={self.kind!r}, slot={self.slot}, depth={self.depth})"
+
+
+class SymbolOperand(str):
+    """附带符号信息的四元式操作数，与标识符名字符串相等"""
+
+    def __new__(cls, name: str, symbol: Symbol):
+        operand = super().__new__(cls, name)
+        operand.symbol = symbol
+        return operand
+
+    def __getnewargs__(self):
+        return str(self), self.symbol
+
+    @property
+    def type(self) -> Optional[str]:
+        return self.symbol.type
+
+    @property
+    def slot(self) -> int:
+        return self.symbol.slot
+
+
+class SymbolTable:
+    """作用域符号表
+
+    所有作用域共用一个名字 -> Symbol 的字典，声明时把被遮蔽的旧条目记入撤销日志；
+    退出作用域时按日志回滚到进入时的位置，代价与该作用域内的声明数成正比。
+    每个函数作用域从槽位 0 开始为局部符号编号。
+    """
+
+    def __init__(self):
+        self.table = {}  # 名字 -> 当前可见的 Symbol
+        self.undo_log = []  # (名字, 被遮蔽的旧 Symbol 或 None)
+        self.scope_marks = []  # 每层作用域进入时的 (日志长度, 外层下一个槽位)
+        self.next_slot = 0
+        self.depth = 0
+
+    def lookup(self, name: str) -> Optional[Symbol]:
+        return self.table.get(name)
+
+    def declare(self, name: str, type_: Optional[str], kind: str,
+                token: Optional[Tuple] = None) -> Tuple[Symbol, bool]:
+        """在当前作用域声明符号，返回 (符号, 是否为新声明)；重复声明时返回已有符号"""
+        existing = self.table.get(name)
+        if existing is not None and existing.depth == self.depth:
+            return existing, False
+        symbol = Symbol(name, type_, kind, self.next_slot, self.depth, token)
+        self.next_slot += 1
+        self.undo_log.append((name, existing))
+        self.table[name] = symbol
+        return symbol, True
+
+    def enter_scope(self):
+        """进入新的函数作用域"""
+        self.scope_marks.append((len(self.undo_log), self.next_slot))
+        self.next_slot = 0
+        self.depth += 1
+
+    def exit_scope(self):
+        """退出当前作用域，撤销其中的全部声明"""
+        mark, next_slot = self.scope_marks.pop()
+        undo_log = self.undo_log
+        table = self.table
+        while len(undo_log) > mark:
+            name, previous = undo_log.pop()
+            if previous is None:
+                del table[name]
+            else:
+                table[name] = previous
+        self.next_slot = next_slot
+        self.depth -= 1
+
+    def visible_symbols(self) -> List[Symbol]:
+        return list(self.table.values())